@@ -0,0 +1,156 @@
+"""
+Connection pool settings and statistics used by setup_db.
+
+Every setting can be given in the app config (e.g. through test_config) or
+as an environment variable of the same name:
+
+    DB_POOL_SIZE       connections kept open per process (default 5)
+    DB_MAX_OVERFLOW    extra connections allowed under load (default 10)
+    DB_POOL_TIMEOUT    seconds to wait for a free connection (default 30)
+    DB_POOL_RECYCLE    seconds before a connection is replaced (default 1800)
+    DB_POOL_PRE_PING   test connections on checkout (default true)
+    DB_PGBOUNCER       open a fresh connection per checkout and leave pooling
+                       to PgBouncer in transaction mode (default false)
+"""
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import NullPool, QueuePool
+import os
+import threading
+import time
+
+
+class PoolStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record(self, wait, timed_out=False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+
+    def format(self):
+        return {
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_seconds_total": round(self.wait_total, 6),
+            "wait_seconds_max": round(self.wait_max, 6),
+            "wait_seconds_avg": (
+                round(self.wait_total / self.checkouts, 6) if self.checkouts else 0.0
+            ),
+        }
+
+
+class TimedPoolMixin:
+    """Measures how long each checkout waits for a connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except PoolTimeoutError:
+            self.stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.stats.record(time.perf_counter() - start)
+        return connection
+
+
+class TimedQueuePool(TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedNullPool(TimedPoolMixin, NullPool):
+    pass
+
+
+def _setting(config, name, default, cast=int):
+    value = config.get(name, os.getenv(name))
+    if value is None:
+        return default
+    if cast is bool and isinstance(value, str):
+        return value.lower() in ("1", "true", "yes", "on")
+    return cast(value)
+
+
+def engine_options(config, database_path):
+    """Returns SQLALCHEMY_ENGINE_OPTIONS for the configured pool."""
+    if database_path.startswith("sqlite") and (
+        database_path in ("sqlite://", "sqlite:///") or ":memory:" in database_path
+    ):
+        # In-memory SQLite needs its single shared connection
+        return {}
+
+    if _setting(config, "DB_PGBOUNCER", False, cast=bool):
+        return {"poolclass": TimedNullPool}
+
+    return {
+        "poolclass": TimedQueuePool,
+        "pool_size": _setting(config, "DB_POOL_SIZE", 5),
+        "max_overflow": _setting(config, "DB_MAX_OVERFLOW", 10),
+        "pool_timeout": _setting(config, "DB_POOL_TIMEOUT", 30, cast=float),
+        "pool_recycle": _setting(config, "DB_POOL_RECYCLE", 1800),
+        "pool_pre_ping": _setting(config, "DB_POOL_PRE_PING", True, cast=bool),
+    }
+
+
+def async_engine_options(config, database_path):
+    """Same settings for create_async_engine, which picks its own pool classes."""
+    options = engine_options(config, database_path)
+    poolclass = options.pop("poolclass", None)
+    if poolclass is TimedNullPool:
+        options["poolclass"] = NullPool
+        if database_path.startswith("postgres"):
+            # PgBouncer in transaction mode moves a client between server
+            # connections, where asyncpg's prepared statements do not exist
+            options["connect_args"] = {
+                "statement_cache_size": 0,
+                "prepared_statement_cache_size": 0,
+            }
+    return options
+
+
+def prewarm_pool(engine, connections):
+    """
+    Opens `connections` connections at once and returns them to the pool, so
+    the first requests find them ready. Returns how many were opened.
+    """
+    opened = []
+    try:
+        for _ in range(connections):
+            connection = engine.connect()
+            opened.append(connection)
+            connection.exec_driver_sql("SELECT 1")
+    finally:
+        for connection in opened:
+            connection.close()
+    return len(opened)
+
+
+def pool_status(engine):
+    """Current pool occupancy plus the checkout statistics, if recorded."""
+    pool = engine.pool
+    status = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update(
+            {
+                "size": pool.size(),
+                "checked_in": pool.checkedin(),
+                "checked_out": pool.checkedout(),
+                "overflow": pool.overflow(),
+            }
+        )
+    if isinstance(pool, TimedPoolMixin):
+        status.update(pool.stats.format())
+    return status
@@ -0,0 +1,158 @@
+"""
+Read-replica routing used by setup_db.
+
+Replicas are listed in the app config as REPLICA_DATABASE_URIS, or in the
+DB_REPLICA_URIS environment variable separated by commas. Requests the app
+marks as read-only (g.read_only) run their queries on one healthy replica,
+picked round-robin; everything else, including every flush, uses the primary.
+Data kept across requests (indexes, cached bodies) is always loaded from the
+primary through `on_primary()`, since a copy taken from a lagging replica
+would stay stale for its whole TTL, however short the lag.
+
+    DB_REPLICA_HEALTH_INTERVAL   seconds between replica health checks
+                                 (default 10)
+    DB_REPLICA_CONNECT_TIMEOUT   seconds to wait for a Postgres replica
+                                 connection (default 2)
+"""
+
+from contextlib import contextmanager
+from flask import current_app, g, has_request_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
+import os
+import threading
+
+from db_pool import _setting, engine_options, pool_status
+
+
+def replica_uris(config):
+    uris = config.get("REPLICA_DATABASE_URIS")
+    if uris is None:
+        uris = [uri for uri in os.getenv("DB_REPLICA_URIS", "").split(",") if uri]
+    return list(uris)
+
+
+class ReplicaRouter:
+    """
+    Round-robin over the replicas that passed their last health check. A
+    replica whose connection drops is taken out until the next check.
+
+    The checks run every `health_interval` seconds in a background thread,
+    started by the first `choose()` of each process (so workers forked from
+    a preloaded app get their own), and never delay a request.
+    """
+
+    def __init__(self, engines, health_interval=10):
+        self.engines = engines
+        self.health_interval = health_interval
+        self.healthy = {engine: True for engine in engines}
+        self._lock = threading.Lock()
+        self._next = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+        for engine in engines:
+            event.listen(engine, "handle_error", self._on_error)
+
+    def _on_error(self, context):
+        if context.is_disconnect and context.engine in self.healthy:
+            self.healthy[context.engine] = False
+
+    def check_health(self):
+        for engine in self.engines:
+            try:
+                with engine.connect() as connection:
+                    connection.execute(text("SELECT 1"))
+                self.healthy[engine] = True
+            except Exception:
+                self.healthy[engine] = False
+
+    def start(self):
+        self._pid = os.getpid()
+        self._thread = threading.Thread(
+            target=self._run, name="replica-health", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.health_interval):
+            self.check_health()
+
+    def choose(self):
+        """Next healthy replica engine, or None to use the primary."""
+        with self._lock:
+            if self._pid != os.getpid():
+                self.start()
+            for _ in range(len(self.engines)):
+                engine = self.engines[self._next % len(self.engines)]
+                self._next += 1
+                if self.healthy[engine]:
+                    return engine
+        return None
+
+    def status(self):
+        return [
+            {
+                "url": make_url(engine.url).render_as_string(hide_password=True),
+                "healthy": self.healthy[engine],
+                **pool_status(engine),
+            }
+            for engine in self.engines
+        ]
+
+
+def create_replica_router(config):
+    """Returns a ReplicaRouter for the configured replicas, or None."""
+    uris = replica_uris(config)
+    if not uris:
+        return None
+    connect_timeout = _setting(config, "DB_REPLICA_CONNECT_TIMEOUT", 2)
+    engines = []
+    for uri in uris:
+        options = engine_options(config, uri)
+        if make_url(uri).get_backend_name() == "postgresql":
+            # A blackholed replica fails fast instead of hanging its checks
+            options["connect_args"] = {"connect_timeout": connect_timeout}
+        engines.append(create_engine(uri, **options))
+    return ReplicaRouter(
+        engines,
+        health_interval=_setting(config, "DB_REPLICA_HEALTH_INTERVAL", 10, float),
+    )
+
+
+@contextmanager
+def on_primary():
+    """Runs the enclosed queries of a read-only request on the primary."""
+    if not has_request_context() or not g.get("read_only"):
+        yield
+        return
+    g.read_only = False
+    try:
+        yield
+    finally:
+        g.read_only = True
+
+
+class RoutingSession(Session):
+    """Sends the queries of read-only requests to a replica."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        # An explicit session bind (e.g. a test transaction) takes precedence
+        if bind is None and self.bind is not None:
+            return self.bind
+        if bind is None and not self._flushing and has_request_context():
+            router = current_app.extensions.get("replicas")
+            if router is not None and g.get("read_only"):
+                # Keep one replica for the whole request unless it goes down
+                engine = g.get("replica")
+                if engine is None or not router.healthy[engine]:
+                    engine = g.replica = router.choose()
+                if engine is not None:
+                    return engine
+        return super().get_bind(mapper, clause=clause, bind=bind, **kwargs)
@@ -0,0 +1,189 @@
+"""
+Test database fixtures for test_flaskr.py.
+
+The schema and the trivia.psql seed data are loaded once per test process,
+in-process (no psql subprocess). Each test then runs inside a transaction
+on a single connection that is rolled back afterwards; commits made by the
+app only release a SAVEPOINT, so every test starts from the seed data.
+
+The database is chosen from the environment:
+
+    TEST_DATABASE_URL   any SQLAlchemy URI to use as is
+    DB_NAME_TEST, ...   Postgres, as documented in the README
+    (neither)           a SQLite file in the temp directory
+
+Under pytest-xdist (`pytest -n auto`) each worker gets its own database,
+named after PYTEST_XDIST_WORKER; Postgres worker databases are created on
+first use.
+"""
+
+import atexit
+import os
+import re
+import tempfile
+
+from sqlalchemy import create_engine, event, insert, text
+from sqlalchemy.engine import make_url
+
+from models import db, Question, Category
+
+SEED_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "trivia.psql")
+
+
+def read_seed_rows(path=SEED_FILE):
+    """Returns {table: [row dicts]} from the COPY blocks of a pg_dump file."""
+    with open(path, encoding="utf-8") as dump:
+        source = dump.read()
+
+    tables = {}
+    for table, columns, block in re.findall(
+        r"COPY public\.(\w+) \(([^)]*)\) FROM stdin;\n(.*?)^\\\.$",
+        source,
+        re.S | re.M,
+    ):
+        names = [name.strip() for name in columns.split(",")]
+        tables[table] = [
+            dict(zip(names, line.split("\t"))) for line in block.splitlines()
+        ]
+    return tables
+
+
+def _cast_rows(rows, model):
+    # COPY text holds strings; \N is NULL
+    columns = model.__table__.columns
+    return [
+        {
+            name: (
+                None
+                if value == r"\N"
+                else int(value) if columns[name].type.python_type is int else value
+            )
+            for name, value in row.items()
+        }
+        for row in rows
+    ]
+
+
+def database_url():
+    worker = os.getenv("PYTEST_XDIST_WORKER")
+    url = os.getenv("TEST_DATABASE_URL")
+    if url is None and os.getenv("DB_NAME_TEST"):
+        url = (
+            f"postgresql://{os.getenv('DB_USER_TEST')}:{os.getenv('DB_PASS_TEST')}"
+            f"@{os.getenv('DB_HOST_TEST')}/{os.getenv('DB_NAME_TEST')}"
+        )
+    if url is None:
+        return "sqlite:///" + os.path.join(
+            tempfile.gettempdir(), f"trivia_test_{worker or 'main'}_{os.getpid()}.db"
+        )
+    if worker and not url.startswith("sqlite"):
+        parsed = make_url(url)
+        url = parsed.set(database=f"{parsed.database}_{worker}").render_as_string(
+            hide_password=False
+        )
+    return url
+
+
+def _enable_sqlite_savepoints(engine):
+    # pysqlite starts transactions itself and breaks SAVEPOINT; let
+    # SQLAlchemy emit BEGIN instead, as its documentation recommends
+    @event.listens_for(engine, "connect")
+    def do_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def do_begin(connection):
+        connection.exec_driver_sql("BEGIN")
+
+
+class SeededDatabase:
+    """Loads the seed data once and wraps each test in a rolled back transaction."""
+
+    def __init__(self, url=None):
+        self.url = url or database_url()
+        self.loaded = False
+        self._app = None
+        self._connection = None
+        self._transaction = None
+
+    def _create_database(self):
+        url = make_url(self.url)
+        if url.get_backend_name() != "postgresql":
+            return
+        admin = create_engine(
+            url.set(database="postgres"), isolation_level="AUTOCOMMIT"
+        )
+        with admin.connect() as connection:
+            exists = connection.scalar(
+                text("SELECT 1 FROM pg_database WHERE datname = :name"),
+                {"name": url.database},
+            )
+            if not exists:
+                connection.exec_driver_sql(f'CREATE DATABASE "{url.database}"')
+        admin.dispose()
+
+    def load(self):
+        """Creates the schema and inserts the seed data, once per process."""
+        if self.loaded:
+            return
+        self._create_database()
+        engine = create_engine(self.url)
+        seed = read_seed_rows()
+        with engine.begin() as connection:
+            db.metadata.drop_all(connection)
+            db.metadata.create_all(connection)
+            connection.execute(
+                insert(Category), _cast_rows(seed["categories"], Category)
+            )
+            connection.execute(
+                insert(Question), _cast_rows(seed["questions"], Question)
+            )
+            if connection.dialect.name == "postgresql":
+                # Explicit ids leave the sequences behind
+                for table in ("categories", "questions"):
+                    connection.execute(
+                        text(
+                            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                            f"(SELECT max(id) FROM {table}))"
+                        )
+                    )
+        engine.dispose()
+        if self.url.startswith("sqlite:///"):
+            atexit.register(self.remove)
+        self.loaded = True
+
+    def bind(self, app):
+        """
+        Opens a transaction on the app's engine and binds db.session to it,
+        replacing any previous binding. Sessions commit to SAVEPOINTs.
+        """
+        self.rollback()
+        with app.app_context():
+            engine = db.engine
+            if engine.dialect.name == "sqlite":
+                _enable_sqlite_savepoints(engine)
+            self._app = app
+            self._connection = engine.connect()
+            self._transaction = self._connection.begin()
+            db.session.configure(
+                bind=self._connection, join_transaction_mode="create_savepoint"
+            )
+
+    def rollback(self):
+        """Discards everything the test wrote and unbinds db.session."""
+        if self._app is None:
+            return
+        with self._app.app_context():
+            db.session.remove()
+            db.session.configure(
+                bind=None, join_transaction_mode="conditional_savepoint"
+            )
+        self._transaction.rollback()
+        self._connection.close()
+        self._connection.engine.dispose()
+        self._app = self._connection = self._transaction = None
+
+    def remove(self):
+        path = make_url(self.url).database
+        if path and os.path.exists(path):
+            os.remove(path)
@@ -1,35 +1,339 @@
-from flask import Flask, request, abort, jsonify
+from flask import Flask, request, abort, jsonify, g, stream_with_context
 from flask_cors import CORS
-import random
-from models import setup_db, Question, Category, db
+from werkzeug.exceptions import NotFound
+import click
+import json
+import time
+from models import (
+    setup_db,
+    Question,
+    Category,
+    db,
+    data_version,
+    QUESTION_COLUMNS,
+    format_question_rows,
+)
+from sqlalchemy import func
 from sqlalchemy.exc import SQLAlchemyError
-from werkzeug.exceptions import HTTPException
+from db_pool import _setting, pool_status, prewarm_pool
+from db_replicas import on_primary
+from .question_pool import (
+    QuestionPool,
+    MAX_BATCH_SIZE,
+    QUIZ_LENGTH,
+    difficulty_target,
+    selection_options,
+)
+from .quiz_sessions import create_quiz_session_store, draw_questions
+from .search import create_search_backend
+from .cache import create_response_cache, SingleFlight
+from .importer import decode_lines, import_questions
+from .exporter import export_questions
+from .deletion import (
+    PurgeJob,
+    check_soft_delete_schema,
+    delete_questions,
+    deletion_criteria,
+    purge_deleted_questions,
+)
+from .compression import init_compression
+from .rate_limit import init_rate_limiting
+from .resilience import init_resilience, retry_transient
+from .startup import StartupReport, readiness, start_warm_up
+
+# Opt-in subsystems (FAST_JSON, INSTRUMENTATION, PROFILING, READ_MODEL) are
+# imported by create_app only when enabled, to keep them out of cold starts
 
 QUESTIONS_PER_PAGE = 10
 
-
-def paginate_questions(request, questions):
+# Read endpoints answered with 304 when the client's ETag is still current
+CONDITIONAL_ENDPOINTS = {"get_categories", "get_questions", "get_questions_by_category"}
+
+# Endpoints sent to a read replica when replicas are configured
+READ_ENDPOINTS = CONDITIONAL_ENDPOINTS | {
+    "search_questions",
+    "stream_export_questions",
+    "play_quiz",
+    "play_quiz_batch",
+    "start_quiz_session",
+    "next_quiz_question",
+}
+
+# Endpoints after which the client reads from the primary for a while
+WRITE_ENDPOINTS = {
+    "add_question",
+    "delete_question",
+    "bulk_delete_questions",
+    "bulk_import_questions",
+}
+
+# Cookie marking a client that wrote within REPLICA_READ_YOUR_WRITES seconds
+PRIMARY_COOKIE = "read_primary"
+
+
+def paginate_questions(request, selection):
+    """
+    Applies LIMIT/OFFSET (or a keyset cursor when `after_id` is given) to the
+    query so only one page of questions is loaded and formatted.
+    """
     page = request.args.get("page", 1, type=int)
-    start = (page - 1) * QUESTIONS_PER_PAGE
-    end = start + QUESTIONS_PER_PAGE
+    after_id = request.args.get("after_id", type=int)
+    selection = page_selection(selection, page, after_id)
+    return format_question_rows(selection.all())
+
+
+def page_selection(selection, page=1, after_id=None):
+    """Limits a query or select() of questions to one page, ordered by id."""
+    selection = selection.order_by(Question.id)
+    if after_id is not None:
+        selection = selection.filter(Question.id > after_id)
+    else:
+        selection = selection.offset((max(page, 1) - 1) * QUESTIONS_PER_PAGE)
+    return selection.limit(QUESTIONS_PER_PAGE)
 
-    formatted_questions = [question.format() for question in questions]
-    return formatted_questions[start:end]
+
+def count_questions(*criteria):
+    return db.session.query(func.count(Question.id)).filter(*criteria).scalar()
 
 
 def create_app(test_config=None):
+    # create_app timings, served at /ready
+    startup = StartupReport()
     app = Flask(__name__)
 
     if test_config is None:
         setup_db(app)
     else:
+        app.config.from_mapping(test_config)
         database_path = test_config.get("SQLALCHEMY_DATABASE_URI")
         setup_db(app, database_path=database_path)
 
+    startup.echo = app.config.get("STARTUP_REPORT", False)
+    # Measured by the entry point (wsgi.py), in seconds per module group
+    startup.imports.update(app.config.get("STARTUP_IMPORT_TIMES", {}))
+    startup.mark("setup_db")
+
+    if app.config.get("FAST_JSON"):
+        from .json_provider import FastJSONProvider
+
+        app.json = FastJSONProvider(app)
+
     CORS(app)
 
+    # Per-client token buckets; registered first so limited requests stop early
+    rate_limiter = init_rate_limiting(app)
+
+    # gzip/Brotli bodies; registered first so it runs after the other hooks
+    compressed_cache = init_compression(
+        app, cacheable_endpoints=CONDITIONAL_ENDPOINTS | {"search_questions"}
+    )
+
+    # Opt-in per-request SQL/serialization timing, Server-Timing and /metrics
+    metrics = None
+    if app.config.get("INSTRUMENTATION"):
+        from .instrumentation import init_instrumentation
+
+        metrics = init_instrumentation(app)
+
+    # Error handlers, load shedding and per-route statement timeouts
+    resilience = init_resilience(app)
+
+    # Opt-in cProfile/sampling profiles of selected requests
+    if app.config.get("PROFILING"):
+        from .profiling import init_profiling
+
+        init_profiling(app)
+    startup.mark("middleware")
+
+    # Per-category id index used to pick quiz questions without a table scan
+    question_pool = QuestionPool(ttl=app.config.get("QUIZ_POOL_TTL", 60))
+
+    # Server-side quiz state so clients don't resend previous_questions
+    quiz_sessions = create_quiz_session_store(app)
+    quiz_length = app.config.get("QUIZ_SESSION_LENGTH", QUIZ_LENGTH)
+
+    search_backend = create_search_backend(app)
+
+    # Opt-in in-memory copy of the data that the read routes are served from
+    read_model = None
+    if app.config.get("READ_MODEL"):
+        from .read_model import ReadModel
+
+        read_model = ReadModel(ttl=app.config.get("READ_MODEL_TTL", 60))
+        # With LAZY_STARTUP the warm-up or the first read loads it instead
+        if not app.config.get("LAZY_STARTUP"):
+            with app.app_context():
+                try:
+                    read_model.refresh()
+                except SQLAlchemyError:
+                    # e.g. tables not created yet; the first read loads it
+                    app.logger.warning("read model not loaded at startup")
+
+    # Serialized bodies of the category read endpoints
+    response_cache = create_response_cache(app)
+
+    # Concurrent misses on the same cache key share one build
+    read_flights = SingleFlight()
+    startup.mark("indexes")
+
+    if metrics is not None:
+
+        def cache_metrics():
+            stats = response_cache.stats()
+            return [
+                "# TYPE trivia_response_cache_hits_total counter",
+                f"trivia_response_cache_hits_total {stats['hits']}",
+                "# TYPE trivia_response_cache_misses_total counter",
+                f"trivia_response_cache_misses_total {stats['misses']}",
+            ]
+
+        def pool_metrics():
+            status = pool_status(db.engine)
+            return [
+                f"trivia_db_pool_{name} {value}"
+                for name, value in status.items()
+                if name != "pool"
+            ]
+
+        def resilience_metrics():
+            return [
+                f"trivia_{name}_total {value}"
+                for name, value in resilience.format().items()
+            ]
+
+        def read_model_metrics():
+            if read_model is None:
+                return []
+            stats = read_model.stats()
+            lines = [
+                "# TYPE trivia_read_model_builds_total counter",
+                f"trivia_read_model_builds_total {stats['builds']}",
+            ]
+            if stats["loaded"]:
+                lines.append(
+                    f"trivia_read_model_bytes {stats['memory_bytes']['total']}"
+                )
+            return lines
+
+        metrics.sources.append(cache_metrics)
+        metrics.sources.append(pool_metrics)
+        metrics.sources.append(resilience_metrics)
+
+        def traffic_metrics():
+            lines = [
+                "# TYPE trivia_coalesced_requests_total counter",
+                f"trivia_coalesced_requests_total {read_flights.coalesced}",
+            ]
+            if rate_limiter is not None:
+                lines += [
+                    "# TYPE trivia_rate_limited_total counter",
+                    f"trivia_rate_limited_total {rate_limiter.limited}",
+                ]
+            return lines
+
+        metrics.sources.append(read_model_metrics)
+        metrics.sources.append(traffic_metrics)
+
+    # Deletes only set deleted_at; a purge job removes the rows later, after
+    # running quiz sessions are done with them
+    soft_delete = app.config.get("SOFT_DELETE", False)
+    purge_after = app.config.get(
+        "SOFT_DELETE_RETENTION", app.config.get("QUIZ_SESSION_TTL", 3600)
+    )
+    if soft_delete:
+        # With LAZY_STARTUP this runs, and logs its error, once the engine exists
+        db.on_engine(app, check_soft_delete_schema)
+    if soft_delete and app.config.get("SOFT_DELETE_PURGE_INTERVAL"):
+        purge_job = PurgeJob(
+            app, app.config["SOFT_DELETE_PURGE_INTERVAL"], older_than=purge_after
+        )
+        purge_job.start()
+        app.extensions["question_purge"] = purge_job
+
+    # Read replicas configured by setup_db, or None
+    replicas = app.extensions["replicas"]
+
+    def category_questions_key(category_id):
+        return f"categories/{category_id}/questions"
+
+    def cached_response(key, build):
+        """
+        Serves the JSON body stored under `key`, calling `build` for the
+        payload on a miss. Concurrent misses for the same key wait for a
+        single build. Errors raised by `build` (e.g. 404) are not cached, nor
+        is a body whose key data_changed invalidated during the build.
+        """
+        generation = response_cache.generation(key)
+
+        def build_body():
+            # Shared by every client until invalidated, so never built from
+            # a lagging replica
+            with on_primary():
+                body = jsonify(build()).get_data()
+            response_cache.set(key, body, generation)
+            return body
+
+        # Skips bodies cached by other workers before the client's own write
+        body = None if g.get("read_primary") else response_cache.get(key)
+        if body is None:
+            body = read_flights.do((key, generation), build_body)
+        return app.response_class(body, mimetype="application/json")
+
+    def data_changed(category_id=None):
+        """Drops indexes and cached responses after questions are added or deleted."""
+        question_pool.invalidate()
+        search_backend.invalidate()
+        if read_model is not None:
+            read_model.invalidate()
+        if category_id is not None:
+            response_cache.delete(category_questions_key(category_id))
+
+    def current_etag():
+        """
+        ETag for the read endpoints. It changes on every question write in this
+        process and at least every ETAG_TTL seconds, which bounds how long a
+        write made by another worker can be hidden behind a 304.
+        """
+        bucket = int(time.time() // app.config.get("ETAG_TTL", 60))
+        return f"{data_version}-{bucket}"
+
+    if replicas is not None:
+        primary_window = app.config.get("REPLICA_READ_YOUR_WRITES", 5)
+
+        @app.before_request
+        def route_reads():
+            # Read-your-writes: a client that just wrote reads from the
+            # primary, past the response cache, until its cookie expires
+            g.read_primary = PRIMARY_COOKIE in request.cookies
+            g.read_only = request.endpoint in READ_ENDPOINTS and not g.read_primary
+
+        @app.after_request
+        def stick_to_primary(response):
+            if request.endpoint in WRITE_ENDPOINTS and response.status_code < 400:
+                response.set_cookie(
+                    PRIMARY_COOKIE,
+                    "1",
+                    max_age=primary_window,
+                    httponly=True,
+                    samesite="Lax",
+                )
+            return response
+
+    @app.before_request
+    def check_etag():
+        if request.method != "GET" or request.endpoint not in CONDITIONAL_ENDPOINTS:
+            return None
+
+        g.etag = current_etag()
+        if request.if_none_match.contains_weak(g.etag):
+            response = app.response_class(status=304)
+            response.set_etag(g.etag, weak=True)
+            return response
+
     @app.after_request
     def after_request(response):
+        if response.status_code == 200 and "etag" in g:
+            response.set_etag(g.etag, weak=True)
         response.headers.add(
             "Access-Control-Allow-Headers", "Content-Type, Authorization"
         )
@@ -39,98 +343,107 @@ def create_app(test_config=None):
         return response
 
     @app.route("/categories", methods=["GET"])
+    @retry_transient
     def get_categories():
-        try:
-            categories = Category.query.all()
+        def build():
+            if read_model is not None:
+                categories = read_model.current().categories()
+            else:
+                categories = {
+                    category.id: category.type for category in Category.query.all()
+                }
             if not categories:
                 abort(404)
-            return jsonify(
-                {
-                    "success": True,
-                    "categories": {
-                        category.id: category.type for category in categories
-                    },
-                }
-            )
-
-        except HTTPException as e:
-            # Re-raise HTTP exceptions like 404 so they are handled by Flask's error handlers
-            raise e
+            return {"success": True, "categories": categories}
 
-        except SQLAlchemyError as e:
-            # Log the DB error
-            app.logger.error(f"Database error: {str(e)}")
-
-            # Return a 500 Internal Server Error response
-            return (
-                jsonify({"success": False, "error": "A database error occurred"}),
-                500,
-            )
-
-        except Exception as e:
-            # Handle unexpected errors
-            app.logger.error(f"Unexpected error: {str(e)}")
-
-            # Return a generic error message
-            return (
-                jsonify({"success": False, "error": "An unexpected error occurred"}),
-                500,
-            )
+        return cached_response("categories", build)
 
     @app.route("/questions", methods=["GET"])
+    @retry_transient
     def get_questions():
-        try:
-            questions = Question.query.all()
-            categories = Category.query.all()
-            current_questions = paginate_questions(request, questions)
-            if not current_questions:
-                abort(404)
-
-            return jsonify(
-                {
-                    "success": True,
-                    "questions": current_questions,
-                    "total_questions": len(questions),
-                }
+        if read_model is not None:
+            snapshot = read_model.current()
+            current_questions = format_question_rows(
+                snapshot.page(
+                    request.args.get("page", 1, type=int),
+                    request.args.get("after_id", type=int),
+                    QUESTIONS_PER_PAGE,
+                )
             )
-
-        except HTTPException as e:
-            # Re-raise HTTP exceptions like 404 so they are handled by Flask's error handlers
-            raise e
-
-        except SQLAlchemyError as e:
-            # Log the DB error
-            app.logger.error(f"Database error: {str(e)}")
-
-            # Return a 500 Internal Server Error response
-            return (
-                jsonify({"success": False, "error": "A database error occurred"}),
-                500,
+            total_questions = len(snapshot)
+        else:
+            current_questions = paginate_questions(
+                request, db.session.query(*QUESTION_COLUMNS)
             )
+            total_questions = None
+        if not current_questions:
+            abort(404)
 
-        except Exception as e:
-            # Handle unexpected errors
-            app.logger.error(f"Unexpected error: {str(e)}")
+        response = {
+            "success": True,
+            "questions": current_questions,
+            "total_questions": (
+                count_questions() if total_questions is None else total_questions
+            ),
+        }
+        if "after_id" in request.args:
+            # Cursor for the next page in keyset mode
+            response["next_after_id"] = current_questions[-1]["id"]
 
-            # Return a generic error message
-            return (
-                jsonify({"success": False, "error": "An unexpected error occurred"}),
-                500,
-            )
+        return jsonify(response)
 
     @app.route("/questions/<int:question_id>", methods=["DELETE"])
     def delete_question(question_id):
-        question = Question.query.get(question_id)
-        if not question:
-            abort(404)
         try:
-            question.delete()  # commit() is there within the method
-            return jsonify({"success": True, "deleted": question_id})
-        except:
+            # One DELETE (or UPDATE) ... RETURNING instead of SELECT then DELETE
+            rows = delete_questions([Question.id == question_id], soft=soft_delete)
+        except SQLAlchemyError:
             db.session.rollback()
             abort(422)
         finally:
             db.session.close()
+        if not rows:
+            abort(404)
+
+        data_changed(rows[0].category)
+        return jsonify({"success": True, "deleted": question_id})
+
+    @app.route("/questions/bulk-delete", methods=["POST"])
+    def bulk_delete_questions():
+        try:
+            criteria = deletion_criteria(request.get_json(silent=True))
+        except ValueError:
+            abort(400)
+
+        try:
+            rows = delete_questions(criteria, soft=soft_delete)
+        except SQLAlchemyError:
+            db.session.rollback()
+            abort(422)
+        for category_id in {row.category for row in rows}:
+            data_changed(category_id)
+
+        return jsonify(
+            {
+                "success": True,
+                "deleted": sorted(row.id for row in rows),
+                "total_deleted": len(rows),
+            }
+        )
+
+    @app.cli.command("purge-questions")
+    @click.option(
+        "--older-than",
+        type=float,
+        help="Seconds since the soft delete (default SOFT_DELETE_RETENTION).",
+    )
+    @click.option("--batch-size", default=1000, show_default=True)
+    def purge_questions_command(older_than, batch_size):
+        """Remove soft-deleted questions for good."""
+        if older_than is None:
+            older_than = purge_after
+        purged = purge_deleted_questions(older_than, batch_size=batch_size)
+        click.echo(f"Purged {purged} questions")
 
     @app.route("/questions", methods=["POST"])
     def add_question():
@@ -147,141 +460,239 @@ def create_app(test_config=None):
             new_question = Question(
                 question=question_text,
                 answer=answer,
-                category=category,
+                category=int(category),
                 difficulty=difficulty,
             )
             new_question.insert()
+            data_changed(new_question.category)
             return jsonify({"success": True}), 201
-        except:
+        except (SQLAlchemyError, TypeError, ValueError):
+            db.session.rollback()
             abort(422)
 
-    @app.route("/questions/search", methods=["POST"])
-    def search_questions():
-        try:
-            data = request.get_json()
-            search_term = data.get("searchTerm", "")
-
-            questions = Question.query.filter(
-                Question.question.ilike(f"%{search_term}%")
-            ).all()
-            if not questions:
-                abort(404)
+    @app.route("/questions/import", methods=["POST"])
+    def bulk_import_questions():
+        fmt = request.args.get("format")
+        if fmt is None:
+            fmt = "csv" if request.mimetype == "text/csv" else "jsonl"
+        batch_size = request.args.get(
+            "batch_size", app.config.get("IMPORT_BATCH_SIZE", 1000), type=int
+        )
+        if fmt not in ("csv", "jsonl") or batch_size < 1:
+            abort(400)
 
-            return jsonify(
-                {
-                    "success": True,
-                    "questions": [question.format() for question in questions],
-                    "total_questions": len(questions),
-                }
+        # Read the upload line by line instead of buffering the whole body
+        report = import_questions(
+            decode_lines(request.stream), fmt=fmt, batch_size=batch_size
+        )
+        for category_id in report.categories:
+            data_changed(category_id)
+        return jsonify({"success": True, **report.format()})
+
+    @app.cli.command("import-questions")
+    @click.argument("path", type=click.Path(exists=True, dir_okay=False))
+    @click.option("--format", "fmt", type=click.Choice(["jsonl", "csv"]))
+    @click.option("--batch-size", default=1000, show_default=True)
+    def import_questions_command(path, fmt, batch_size):
+        """Import questions from a JSON Lines or CSV file."""
+        if fmt is None:
+            fmt = "csv" if path.endswith(".csv") else "jsonl"
+        with open(path, "rb") as upload:
+            report = import_questions(
+                decode_lines(upload), fmt=fmt, batch_size=batch_size
             )
+        click.echo(json.dumps(report.format(), indent=2))
 
-        except HTTPException as e:
-            # Re-raise HTTP exceptions like 404 so they are handled by Flask's error handlers
-            raise e
-
-        except SQLAlchemyError as e:
-            # Log the DB error
-            app.logger.error(f"Database error: {str(e)}")
+    @app.route("/questions/export", methods=["GET"])
+    def stream_export_questions():
+        fmt = request.args.get("format", "ndjson")
+        if fmt not in ("ndjson", "csv"):
+            abort(400)
 
-            # Return a 500 Internal Server Error response
-            return (
-                jsonify({"success": False, "error": "A database error occurred"}),
-                500,
-            )
+        chunks = export_questions(
+            fmt,
+            category=request.args.get("category", type=int),
+            difficulty=request.args.get("difficulty", type=int),
+            chunk_size=app.config.get("EXPORT_CHUNK_SIZE", 1000),
+        )
+        mimetype = "text/csv" if fmt == "csv" else "application/x-ndjson"
+        return app.response_class(stream_with_context(chunks), mimetype=mimetype)
+
+    @app.cli.command("export-questions")
+    @click.option("--format", "fmt", type=click.Choice(["ndjson", "csv"]))
+    @click.option("--category", type=int)
+    @click.option("--difficulty", type=int)
+    @click.option("--output", "-o", type=click.File("w"), default="-")
+    def export_questions_command(fmt, category, difficulty, output):
+        """Export questions as NDJSON (default) or CSV."""
+        for chunk in export_questions(fmt or "ndjson", category, difficulty):
+            output.write(chunk)
 
-        except Exception as e:
-            # Handle unexpected errors
-            app.logger.error(f"Unexpected error: {str(e)}")
+    @app.route("/questions/search", methods=["POST"])
+    @retry_transient
+    def search_questions():
+        data = request.get_json()
+        search_term = data.get("searchTerm", "")
+        page = request.args.get("page", 1, type=int)
+
+        backend = search_backend if read_model is None else read_model.current()
+        total, questions = backend.search(
+            search_term,
+            offset=(max(page, 1) - 1) * QUESTIONS_PER_PAGE,
+            limit=QUESTIONS_PER_PAGE,
+        )
+        if not questions:
+            abort(404)
 
-            # Return a generic error message
-            return (
-                jsonify({"success": False, "error": "An unexpected error occurred"}),
-                500,
-            )
+        return jsonify(
+            {
+                "success": True,
+                "questions": format_question_rows(questions),
+                "total_questions": total,
+            }
+        )
 
     @app.route("/categories/<int:category_id>/questions", methods=["GET"])
+    @retry_transient
     def get_questions_by_category(category_id):
-        try:
-            questions = Question.query.filter_by(category=str(category_id)).all()
+        def build():
+            if read_model is not None:
+                questions = read_model.current().category_rows(category_id)
+            else:
+                questions = (
+                    db.session.query(*QUESTION_COLUMNS)
+                    .filter(Question.category == category_id)
+                    .order_by(Question.id)
+                    .all()
+                )
             if not questions:
                 abort(404)
+            return {
+                "success": True,
+                "questions": format_question_rows(questions),
+                "total_questions": len(questions),
+                "current_category": category_id,
+            }
 
-            return jsonify(
-                {
-                    "success": True,
-                    "questions": [question.format() for question in questions],
-                    "total_questions": len(questions),
-                    "current_category": category_id,
-                }
-            )
-
-        except HTTPException as e:
-            # Re-raise HTTP exceptions like 404 so they are handled by Flask's error handlers
-            raise e
-
-        except SQLAlchemyError as e:
-            # Log the DB error
-            app.logger.error(f"Database error: {str(e)}")
-
-            # Return a 500 Internal Server Error response
-            return (
-                jsonify({"success": False, "error": "A database error occurred"}),
-                500,
-            )
-
-        except Exception as e:
-            # Handle unexpected errors
-            app.logger.error(f"Unexpected error: {str(e)}")
-
-            # Return a generic error message
-            return (
-                jsonify({"success": False, "error": "An unexpected error occurred"}),
-                500,
-            )
+        return cached_response(category_questions_key(category_id), build)
 
     @app.route("/quizzes", methods=["POST"])
+    @retry_transient
     def play_quiz():
+        data = request.get_json()
+        previous_questions = data.get("previous_questions", [])
+        quiz_category = data.get("quiz_category", {})
         try:
-            data = request.get_json()
-            previous_questions = data.get("previous_questions", [])
-            quiz_category = data.get("quiz_category", {})
+            difficulty, category_weights = selection_options(
+                data, answered=len(previous_questions)
+            )
+        except ValueError:
+            abort(400)
 
-            if quiz_category.get("id"):
-                questions = (
-                    Question.query.filter_by(category=str(quiz_category["id"]))
-                    .filter(Question.id.notin_(previous_questions))
-                    .all()
-                )
-            else:
-                questions = Question.query.filter(
-                    Question.id.notin_(previous_questions)
-                ).all()
+        options = dict(
+            category_id=quiz_category.get("id") or None,
+            exclude=previous_questions,
+            difficulty=difficulty,
+            category_weights=category_weights,
+        )
+        if read_model is not None:
+            question = read_model.current().next_question(**options)
+        else:
+            question = question_pool.next_question(**options)
+            question = question and question.format()
 
-            if not questions:
-                return jsonify({"success": True, "question": None})
+        return jsonify({"success": True, "question": question})
 
-            next_question = random.choice(questions).format()
-            return jsonify({"success": True, "question": next_question})
+    @app.route("/quizzes/batch", methods=["POST"])
+    @retry_transient
+    def play_quiz_batch():
+        data = request.get_json()
+        previous_questions = data.get("previous_questions", [])
+        quiz_category = data.get("quiz_category") or {}
+        count = data.get("count", QUIZ_LENGTH)
+        if not isinstance(count, int) or not 1 <= count <= MAX_BATCH_SIZE:
+            abort(400)
+        try:
+            _, category_weights = selection_options(data)
+            difficulties = [
+                difficulty_target(data.get("difficulty"), len(previous_questions) + i)
+                for i in range(count)
+            ]
+        except ValueError:
+            abort(400)
 
-        except SQLAlchemyError as e:
-            # Log the DB error
-            app.logger.error(f"Database error: {str(e)}")
+        questions = question_pool.next_questions(
+            count,
+            category_id=quiz_category.get("id") or None,
+            exclude=previous_questions,
+            difficulties=difficulties,
+            category_weights=category_weights,
+        )
+        return jsonify({"success": True, "questions": format_question_rows(questions)})
 
-            # Return a 500 Internal Server Error response
-            return (
-                jsonify({"success": False, "error": "A database error occurred"}),
-                500,
-            )
+    @app.route("/quizzes/sessions", methods=["POST"])
+    @retry_transient
+    def start_quiz_session():
+        data = request.get_json(silent=True) or {}
+        quiz_category = data.get("quiz_category") or {}
+        category_id = quiz_category.get("id") or None
 
-        except Exception as e:
-            # Handle unexpected errors
-            app.logger.error(f"Unexpected error: {str(e)}")
+        question_ids = draw_questions(question_pool.ids(category_id), quiz_length)
+        session_id = quiz_sessions.create(question_ids)
+        return (
+            jsonify(
+                {
+                    "success": True,
+                    "session_id": session_id,
+                    "total_questions": len(question_ids),
+                }
+            ),
+            201,
+        )
 
-            # Return a generic error message
-            return (
-                jsonify({"success": False, "error": "An unexpected error occurred"}),
-                500,
+    @app.route("/quizzes/sessions/<session_id>/next", methods=["POST"])
+    def next_quiz_question(session_id):
+        while True:
+            step = quiz_sessions.advance(session_id)
+            if step is None:
+                abort(404)
+            question_id, remaining = step
+            if question_id is None:
+                return jsonify({"success": True, "question": None, "remaining": 0})
+
+            # Soft-deleted questions stay playable until they are purged;
+            # skip those removed since the session started
+            question = db.session.get(
+                Question, question_id, execution_options={"include_deleted": True}
             )
+            if question is not None:
+                return jsonify(
+                    {
+                        "success": True,
+                        "question": question.format(),
+                        "remaining": remaining,
+                    }
+                )
+
+    @app.route("/cache/stats", methods=["GET"])
+    def get_cache_stats():
+        response = {
+            "success": True,
+            "cache": response_cache.stats(),
+            "coalesced": read_flights.coalesced,
+        }
+        if compressed_cache is not None:
+            response["compression"] = compressed_cache.stats()
+        if read_model is not None:
+            response["read_model"] = read_model.stats()
+        return jsonify(response)
+
+    @app.route("/db/pool", methods=["GET"])
+    def get_pool_status():
+        response = {"success": True, "pool": pool_status(db.engine)}
+        if replicas is not None:
+            response["replicas"] = replicas.status()
+        return jsonify(response)
 
     @app.errorhandler(404)
     def not_found(error):
@@ -303,4 +714,34 @@ def create_app(test_config=None):
     def bad_request(error):
         return jsonify({"success": False, "error": 400, "message": "Bad request"}), 400
 
+    @app.route("/ready", methods=["GET"])
+    def get_readiness():
+        return readiness(startup)
+
+    def warm_up():
+        """Opens pool connections and loads the categories and quiz index."""
+        prewarm_pool(
+            db.engine,
+            app.config.get(
+                "WARM_UP_CONNECTIONS", _setting(app.config, "DB_POOL_SIZE", 5)
+            ),
+        )
+        with app.test_request_context("/categories"):
+            try:
+                app.view_functions["get_categories"]()
+            except NotFound:
+                pass  # no categories yet
+            question_pool.ids()
+            if read_model is not None:
+                read_model.current()
+
+    startup.mark("routes")
+    app.extensions["startup"] = startup
+    if app.config.get("WARM_UP"):
+        start_warm_up(
+            app, startup, warm_up, background=app.config["WARM_UP"] == "background"
+        )
+    else:
+        startup.set_ready()
+
     return app
@@ -0,0 +1,341 @@
+"""
+Async (ASGI) serving mode for the read and quiz endpoints.
+
+Serves GET /categories, GET /questions, POST /questions/search,
+GET /categories/<id>/questions and POST /quizzes with the same models and
+response bodies as the Flask app, on Starlette with an async SQLAlchemy
+engine (asyncpg for Postgres, aiosqlite for SQLite). Run it with:
+
+    uvicorn --factory flaskr.asgi:create_asgi_app --workers 4
+
+Requires the packages in requirements-async.txt.
+"""
+
+from contextlib import asynccontextmanager
+import json
+import time
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from starlette.applications import Starlette
+from starlette.exceptions import HTTPException
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+import models
+from db_pool import async_engine_options
+from models import Question, Category, QUESTION_COLUMNS, format_question_rows
+from . import QUESTIONS_PER_PAGE, page_selection
+from .question_pool import QuestionPool, selection_options
+from .search import (
+    InvertedIndexSearch,
+    build_search_index,
+    fulltext_criteria,
+    rank_ids,
+)
+
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+ERROR_MESSAGES = {
+    400: "Bad request",
+    404: "Resource not found",
+    422: "Unprocessable entity",
+}
+
+
+class TriviaJSONResponse(JSONResponse):
+    """Encodes bodies exactly like Flask's jsonify (sorted, compact, ASCII)."""
+
+    def render(self, content):
+        return (
+            json.dumps(content, sort_keys=True, separators=(",", ":")) + "\n"
+        ).encode()
+
+
+class AsyncQuestionPool(QuestionPool):
+    """
+    QuestionPool that rebuilds its index through an async session, from the
+    questions matching `criteria`.
+    """
+
+    def __init__(self, ttl=60, criteria=()):
+        super().__init__(ttl=ttl)
+        self.criteria = criteria
+
+    async def ids_async(self, session, category_id=None):
+        if self._is_stale():
+            result = await session.execute(
+                select(Question.id, Question.category, Question.difficulty)
+                .where(*self.criteria)
+                .order_by(Question.id)
+            )
+            self.load(result.all())
+        return self._lookup(category_id)
+
+
+class AsyncInvertedIndexSearch(InvertedIndexSearch):
+    """
+    InvertedIndexSearch that rebuilds its index through an async session,
+    from the questions matching `criteria`.
+    """
+
+    def __init__(self, ttl=60, criteria=()):
+        super().__init__(ttl=ttl)
+        self.criteria = criteria
+
+    async def ranked_ids_async(self, session, term):
+        if self._is_stale():
+            result = await session.execute(
+                select(Question.id, Question.question)
+                .where(*self.criteria)
+                .order_by(Question.id)
+            )
+            self._index = build_search_index(result.all())
+            self._built_at = time.monotonic()
+        return rank_ids(self._index, term)
+
+
+def async_database_url(database_path):
+    scheme, _, rest = database_path.partition("://")
+    driver = ASYNC_DRIVERS.get(scheme.split("+")[0], scheme)
+    return f"{driver}://{rest}"
+
+
+def int_arg(request, name, default=None):
+    # Same leniency as Flask's request.args.get(name, type=int)
+    try:
+        return int(request.query_params[name])
+    except (KeyError, ValueError):
+        return default
+
+
+async def json_body(request):
+    try:
+        return await request.json()
+    except ValueError:
+        raise HTTPException(400)
+
+
+async def get_categories(request):
+    async with request.app.state.sessions() as session:
+        result = await session.execute(select(Category.id, Category.type))
+        categories = result.all()
+    if not categories:
+        raise HTTPException(404)
+
+    return TriviaJSONResponse(
+        {"success": True, "categories": {id: type for id, type in categories}}
+    )
+
+
+async def get_questions(request):
+    after_id = int_arg(request, "after_id")
+    live = request.app.state.live
+    selection = page_selection(
+        select(*QUESTION_COLUMNS).where(*live), int_arg(request, "page", 1), after_id
+    )
+    async with request.app.state.sessions() as session:
+        current_questions = format_question_rows(
+            (await session.execute(selection)).all()
+        )
+        if not current_questions:
+            raise HTTPException(404)
+        total = await session.scalar(select(func.count(Question.id)).where(*live))
+
+    response = {
+        "success": True,
+        "questions": current_questions,
+        "total_questions": total,
+    }
+    if after_id is not None:
+        response["next_after_id"] = current_questions[-1]["id"]
+    return TriviaJSONResponse(response)
+
+
+async def search_questions(request):
+    data = await json_body(request)
+    search_term = data.get("searchTerm", "")
+    page = int_arg(request, "page", 1)
+
+    offset = (max(page, 1) - 1) * QUESTIONS_PER_PAGE
+
+    async with request.app.state.sessions() as session:
+        if request.app.state.fulltext:
+            criteria, rank = fulltext_criteria(search_term)
+            live = request.app.state.live
+            total = await session.scalar(
+                select(func.count(Question.id)).where(criteria, *live)
+            )
+            result = await session.execute(
+                select(*QUESTION_COLUMNS)
+                .where(criteria, *live)
+                .order_by(rank.desc(), Question.id)
+                .offset(offset)
+                .limit(QUESTIONS_PER_PAGE)
+            )
+            questions = result.all()
+        else:
+            # Same ranking as the Flask app's InvertedIndexSearch
+            search = request.app.state.search_index
+            question_ids = await search.ranked_ids_async(session, search_term)
+            total = len(question_ids)
+            page_ids = question_ids[offset : offset + QUESTIONS_PER_PAGE]
+            result = await session.execute(
+                select(*QUESTION_COLUMNS).where(Question.id.in_(page_ids))
+            )
+            by_id = {row[0]: row for row in result.all()}
+            questions = [by_id[i] for i in page_ids if i in by_id]
+    if not questions:
+        raise HTTPException(404)
+
+    return TriviaJSONResponse(
+        {
+            "success": True,
+            "questions": format_question_rows(questions),
+            "total_questions": total,
+        }
+    )
+
+
+async def get_questions_by_category(request):
+    category_id = request.path_params["category_id"]
+    async with request.app.state.sessions() as session:
+        result = await session.execute(
+            select(*QUESTION_COLUMNS)
+            .where(Question.category == category_id, *request.app.state.live)
+            .order_by(Question.id)
+        )
+        questions = result.all()
+    if not questions:
+        raise HTTPException(404)
+
+    return TriviaJSONResponse(
+        {
+            "success": True,
+            "questions": format_question_rows(questions),
+            "total_questions": len(questions),
+            "current_category": category_id,
+        }
+    )
+
+
+async def play_quiz(request):
+    data = await json_body(request)
+    exclude = {int(question_id) for question_id in data.get("previous_questions", [])}
+    category_id = (data.get("quiz_category") or {}).get("id") or None
+    try:
+        difficulty, category_weights = selection_options(data, answered=len(exclude))
+    except ValueError:
+        raise HTTPException(400)
+    pool = request.app.state.question_pool
+
+    async with request.app.state.sessions() as session:
+        while True:
+            await pool.ids_async(session, category_id)
+            question_id = pool.pick(category_id, exclude, difficulty, category_weights)
+            if question_id is None:
+                return TriviaJSONResponse({"success": True, "question": None})
+
+            question = await session.scalar(
+                select(Question).where(
+                    Question.id == question_id, *request.app.state.live
+                )
+            )
+            if question is not None:
+                return TriviaJSONResponse(
+                    {"success": True, "question": question.format()}
+                )
+
+            # Deleted since the pool was built
+            exclude.add(question_id)
+            pool.invalidate()
+
+
+async def http_error(request, exc):
+    return TriviaJSONResponse(
+        {
+            "success": False,
+            "error": exc.status_code,
+            "message": ERROR_MESSAGES.get(exc.status_code, exc.detail),
+        },
+        status_code=exc.status_code,
+    )
+
+
+async def server_error(request, exc):
+    return TriviaJSONResponse(
+        {"success": False, "error": "An unexpected error occurred"},
+        status_code=500,
+    )
+
+
+def create_asgi_app(test_config=None):
+    config = dict(test_config or {})
+    models.load_environment()
+    database_path = (
+        config.get("SQLALCHEMY_DATABASE_URI") or models.default_database_path()
+    )
+
+    engine = create_async_engine(
+        async_database_url(database_path),
+        **async_engine_options(config, database_path),
+    )
+
+    @asynccontextmanager
+    async def lifespan(app):
+        yield
+        await engine.dispose()
+
+    app = Starlette(
+        routes=[
+            Route("/categories", get_categories, methods=["GET"]),
+            Route("/questions", get_questions, methods=["GET"]),
+            Route("/questions/search", search_questions, methods=["POST"]),
+            Route(
+                "/categories/{category_id:int}/questions",
+                get_questions_by_category,
+                methods=["GET"],
+            ),
+            Route("/quizzes", play_quiz, methods=["POST"]),
+        ],
+        middleware=[
+            Middleware(
+                CORSMiddleware,
+                allow_origins=["*"],
+                allow_methods=["GET", "POST", "PATCH", "DELETE", "OPTIONS"],
+                allow_headers=["Content-Type", "Authorization"],
+            )
+        ],
+        exception_handlers={HTTPException: http_error, Exception: server_error},
+        lifespan=lifespan,
+    )
+    if config.get("COMPRESSION", True):
+        app.add_middleware(
+            GZipMiddleware,
+            minimum_size=config.get("COMPRESSION_MIN_SIZE", 1024),
+            compresslevel=config.get("COMPRESSION_LEVEL", 6),
+        )
+    app.state.engine = engine
+    app.state.sessions = async_sessionmaker(engine, expire_on_commit=False)
+    # The Flask app hides soft-deleted rows through a session event that
+    # needs its app context, so the criteria are added here instead
+    app.state.live = (
+        (Question.deleted_at.is_(None),) if config.get("SOFT_DELETE") else ()
+    )
+    app.state.question_pool = AsyncQuestionPool(
+        ttl=config.get("QUIZ_POOL_TTL", 60), criteria=app.state.live
+    )
+    app.state.search_index = AsyncInvertedIndexSearch(
+        ttl=config.get("SEARCH_INDEX_TTL", 60), criteria=app.state.live
+    )
+    app.state.fulltext = config.get("SEARCH_BACKEND", "fulltext") == "fulltext" and (
+        database_path.startswith("postgres")
+    )
+    return app
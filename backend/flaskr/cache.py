@@ -0,0 +1,235 @@
+from collections import OrderedDict
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """
+    Base class for serialized response caches. Values are the JSON bodies as
+    bytes, so a hit skips both the query and the serialization.
+
+    `delete` also bumps a per-key generation. A caller reads `generation(key)`
+    before building a body and passes it to `set`, which drops the body if
+    the key was invalidated in between, so a build that raced a write never
+    caches stale data.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        value = self._get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def stats(self):
+        return {"backend": self.name, "hits": self.hits, "misses": self.misses}
+
+
+class NullCache(ResponseCache):
+    name = "none"
+
+    def _get(self, key):
+        return None
+
+    def generation(self, key):
+        return 0
+
+    def set(self, key, value, generation=None):
+        pass
+
+    def delete(self, *keys):
+        pass
+
+
+class LRUCache(ResponseCache):
+    """In-process cache bounded by entry count, with a TTL per entry."""
+
+    name = "memory"
+
+    def __init__(self, max_entries=1024, ttl=60):
+        super().__init__()
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._generations = {}
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def generation(self, key):
+        return self._generations.get(key, 0)
+
+    def set(self, key, value, generation=None):
+        with self._lock:
+            if generation is not None and generation != self.generation(key):
+                return
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+                self._generations[key] = self.generation(key) + 1
+
+
+class RedisCache(ResponseCache):
+    """
+    Cache shared by every worker, backed by any client with the redis-py
+    `get`/`mget`/`set`/`incr` interface. Redis errors are logged and treated
+    as misses so the API keeps serving from the database.
+
+    Each value is stored as b"<generation>:<body>" next to a generation
+    counter. A read fetches both with one MGET and ignores a value written
+    for an older generation, so the check holds across workers.
+    """
+
+    name = "redis"
+
+    def __init__(self, client, ttl=60, prefix="trivia:"):
+        super().__init__()
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self.errors = 0
+
+    def _generation_key(self, key):
+        return self.prefix + key + ":generation"
+
+    def _get(self, key):
+        try:
+            generation, value = self.client.mget(
+                self._generation_key(key), self.prefix + key
+            )
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Response cache get failed: {str(e)}")
+            return None
+        if value is None:
+            return None
+        stored, _, body = value.partition(b":")
+        if int(stored) != int(generation or 0):
+            return None
+        return body
+
+    def generation(self, key):
+        try:
+            return int(self.client.get(self._generation_key(key)) or 0)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Response cache get failed: {str(e)}")
+            return None
+
+    def set(self, key, value, generation=None):
+        if generation is None:
+            generation = self.generation(key)
+            if generation is None:
+                return
+        try:
+            self.client.set(self.prefix + key, b"%d:" % generation + value, ex=self.ttl)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Response cache set failed: {str(e)}")
+
+    def delete(self, *keys):
+        try:
+            for key in keys:
+                self.client.incr(self._generation_key(key))
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Response cache delete failed: {str(e)}")
+
+    def stats(self):
+        stats = super().stats()
+        stats["errors"] = self.errors
+        return stats
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Runs one call per key at a time. Callers that arrive while the call for
+    their key is in progress wait for it and share its result or exception,
+    so a burst of identical cache misses costs one query and one
+    serialization.
+    """
+
+    def __init__(self):
+        self.coalesced = 0
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+def create_response_cache(app):
+    """
+    Builds the cache selected by RESPONSE_CACHE: "memory" (default), "redis"
+    or "none". The Redis backend uses RESPONSE_CACHE_REDIS_CLIENT when given
+    (e.g. a fake in tests), otherwise connects to RESPONSE_CACHE_REDIS_URL.
+    """
+    backend = app.config.get("RESPONSE_CACHE", "memory")
+    ttl = app.config.get("RESPONSE_CACHE_TTL", 60)
+
+    if backend == "none":
+        return NullCache()
+
+    if backend == "redis":
+        client = app.config.get("RESPONSE_CACHE_REDIS_CLIENT")
+        if client is None:
+            import redis  # optional dependency, only needed for this backend
+
+            client = redis.Redis.from_url(app.config["RESPONSE_CACHE_REDIS_URL"])
+        return RedisCache(client, ttl=ttl)
+
+    return LRUCache(max_entries=app.config.get("RESPONSE_CACHE_SIZE", 1024), ttl=ttl)
@@ -0,0 +1,74 @@
+import gzip
+import hashlib
+from importlib.util import find_spec
+
+from flask import request
+
+from .cache import LRUCache
+
+COMPRESSIBLE_MIMETYPES = {"application/json", "application/x-ndjson", "text/csv"}
+
+
+def compress(body, encoding, gzip_level, brotli_quality):
+    if encoding == "br":
+        # Imported on the first Brotli response, not at startup
+        import brotli
+
+        return brotli.compress(body, quality=brotli_quality)
+    # mtime=0 keeps the output identical for identical bodies
+    return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+
+
+def init_compression(app, cacheable_endpoints=()):
+    """
+    Compresses responses of at least COMPRESSION_MIN_SIZE bytes (default
+    1024) with Brotli (when installed) or gzip, following Accept-Encoding.
+    Compressed bodies of `cacheable_endpoints` are kept in an LRU keyed by
+    the digest of the uncompressed body, so repeated payloads are compressed
+    once. Set COMPRESSION to False to turn it off.
+    """
+    if not app.config.get("COMPRESSION", True):
+        return None
+
+    min_size = app.config.get("COMPRESSION_MIN_SIZE", 1024)
+    gzip_level = app.config.get("COMPRESSION_LEVEL", 6)
+    brotli_quality = app.config.get("COMPRESSION_BROTLI_QUALITY", 5)
+    # Optional dependency, gzip only without it; found without importing it
+    encodings = ["br", "gzip"] if find_spec("brotli") is not None else ["gzip"]
+    # Entries never go stale (the key is the body digest); the TTL only
+    # frees memory held by payloads nobody asks for anymore
+    compressed_cache = LRUCache(
+        max_entries=app.config.get("COMPRESSION_CACHE_SIZE", 256), ttl=3600
+    )
+
+    @app.after_request
+    def compress_response(response):
+        if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+            return response
+        response.vary.add("Accept-Encoding")
+        if (
+            response.status_code != 200
+            or response.is_streamed
+            or "Content-Encoding" in response.headers
+        ):
+            return response
+
+        encoding = request.accept_encodings.best_match(encodings)
+        body = response.get_data()
+        if encoding is None or len(body) < min_size:
+            return response
+
+        if request.endpoint in cacheable_endpoints:
+            key = f"{encoding}:{hashlib.blake2b(body, digest_size=16).hexdigest()}"
+            compressed = compressed_cache.get(key)
+            if compressed is None:
+                compressed = compress(body, encoding, gzip_level, brotli_quality)
+                compressed_cache.set(key, compressed)
+        else:
+            compressed = compress(body, encoding, gzip_level, brotli_quality)
+
+        response.set_data(compressed)
+        response.headers["Content-Encoding"] = encoding
+        return response
+
+    return compressed_cache
@@ -0,0 +1,138 @@
+from datetime import timedelta
+import threading
+
+from sqlalchemy import delete, inspect, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from models import db, Question, data_version, utcnow
+
+# Largest id list accepted by one bulk delete request
+MAX_DELETE_IDS = 10000
+
+
+def deletion_criteria(data):
+    """
+    Reads a bulk delete body: "ids" (a list of question ids) and/or the
+    "category" and "difficulty" filters, combined with AND. Returns the
+    WHERE criteria or raises ValueError. A body without any of them is
+    rejected, so a malformed request never deletes every question.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("body must be an object")
+
+    criteria = []
+    try:
+        ids = data.get("ids")
+        if ids is not None:
+            if not isinstance(ids, list) or not 1 <= len(ids) <= MAX_DELETE_IDS:
+                raise ValueError(f"ids must be a list of 1 to {MAX_DELETE_IDS} ids")
+            criteria.append(Question.id.in_(sorted({int(i) for i in ids})))
+        for field in ("category", "difficulty"):
+            if data.get(field) is not None:
+                criteria.append(getattr(Question, field) == int(data[field]))
+    except TypeError as e:
+        raise ValueError(str(e))
+
+    if not criteria:
+        raise ValueError("ids, category or difficulty is required")
+    return criteria
+
+
+def delete_questions(criteria, soft=False):
+    """
+    Deletes the live questions matching `criteria` with one DELETE, or with
+    `soft` marks them deleted with one UPDATE of deleted_at, then commits.
+    Returns the (id, category) rows affected.
+    """
+    if soft:
+        statement = (
+            update(Question)
+            .values(deleted_at=utcnow())
+            .where(Question.deleted_at.is_(None))
+        )
+    else:
+        statement = delete(Question)
+    statement = statement.where(*criteria)
+    rows = db.session.execute(
+        statement.returning(Question.id, Question.category),
+        execution_options={"synchronize_session": False},
+    ).all()
+    db.session.commit()
+    if rows:
+        data_version.bump()
+    return rows
+
+
+def check_soft_delete_schema(engine):
+    """
+    Raises RuntimeError when the questions table has no deleted_at column,
+    so SOFT_DELETE fails at startup instead of on every query.
+    """
+    columns = {column["name"] for column in inspect(engine).get_columns("questions")}
+    if "deleted_at" not in columns:
+        raise RuntimeError(
+            "SOFT_DELETE needs the questions.deleted_at column; apply "
+            "migrations/0003_question_soft_delete.sql first"
+        )
+
+
+def purge_deleted_questions(older_than, batch_size=1000):
+    """
+    Removes the rows soft-deleted more than `older_than` seconds ago, at most
+    `batch_size` per transaction so locks stay short. Returns the count.
+    """
+    cutoff = utcnow() - timedelta(seconds=older_than)
+    purged = 0
+    while True:
+        batch = (
+            select(Question.id)
+            .where(Question.deleted_at < cutoff)
+            .limit(batch_size)
+            .scalar_subquery()
+        )
+        result = db.session.execute(
+            delete(Question).where(Question.id.in_(batch)),
+            execution_options={"synchronize_session": False},
+        )
+        db.session.commit()
+        purged += result.rowcount
+        if result.rowcount < batch_size:
+            return purged
+
+
+class PurgeJob:
+    """Runs purge_deleted_questions every `interval` seconds in a thread."""
+
+    def __init__(self, app, interval, older_than, batch_size=1000):
+        self.app = app
+        self.interval = interval
+        self.older_than = older_than
+        self.batch_size = batch_size
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._run, name="question-purge", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def run_once(self):
+        with self.app.app_context():
+            try:
+                purged = purge_deleted_questions(self.older_than, self.batch_size)
+            except SQLAlchemyError as e:
+                db.session.rollback()
+                self.app.logger.warning(f"Question purge failed: {str(e)}")
+                return 0
+            if purged:
+                self.app.logger.info(f"Purged {purged} deleted questions")
+            return purged
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.run_once()
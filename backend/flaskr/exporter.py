@@ -0,0 +1,66 @@
+import csv
+import io
+import json
+
+from models import db, Question
+
+EXPORT_COLUMNS = ("id", "question", "answer", "category", "difficulty")
+
+
+def export_rows(category=None, difficulty=None, chunk_size=1000):
+    """
+    Yields questions as dicts in id order. `yield_per` streams the rows from
+    a server-side cursor `chunk_size` at a time, so memory stays flat however
+    large the table is.
+    """
+    query = db.session.query(
+        *[getattr(Question, column) for column in EXPORT_COLUMNS]
+    ).order_by(Question.id)
+    if category is not None:
+        query = query.filter(Question.category == category)
+    if difficulty is not None:
+        query = query.filter(Question.difficulty == difficulty)
+
+    for row in query.yield_per(chunk_size):
+        yield dict(zip(EXPORT_COLUMNS, row))
+
+
+def _chunked(lines, chunk_size):
+    # Join lines into larger writes instead of one write per row
+    buffer = []
+    for line in lines:
+        buffer.append(line)
+        if len(buffer) >= chunk_size:
+            yield "".join(buffer)
+            buffer = []
+    if buffer:
+        yield "".join(buffer)
+
+
+def ndjson_lines(rows):
+    for row in rows:
+        yield json.dumps(row) + "\n"
+
+
+def csv_lines(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush():
+        line = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return line
+
+    writer.writerow(EXPORT_COLUMNS)
+    yield flush()
+    for row in rows:
+        writer.writerow([row[column] for column in EXPORT_COLUMNS])
+        yield flush()
+
+
+def export_questions(fmt="ndjson", category=None, difficulty=None, chunk_size=1000):
+    """Returns a generator of text chunks for an NDJSON or CSV export."""
+    rows = export_rows(category, difficulty, chunk_size=chunk_size)
+    lines = csv_lines(rows) if fmt == "csv" else ndjson_lines(rows)
+    return _chunked(lines, chunk_size)
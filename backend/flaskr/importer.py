@@ -0,0 +1,158 @@
+import csv
+import json
+
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+from models import db, Question, Category, data_version
+
+REQUIRED_FIELDS = ("question", "answer", "category", "difficulty")
+
+# Only the first errors are returned in the report, the count is always exact
+MAX_REPORTED_ERRORS = 100
+
+
+def validate_question(data, known_categories):
+    """
+    Returns the insert values for one question payload. Applies the same
+    checks as POST /questions and raises ValueError with the reason otherwise.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("row must be an object")
+    if not all(data.get(field) for field in REQUIRED_FIELDS):
+        raise ValueError("question, answer, category and difficulty are required")
+
+    try:
+        category = int(data["category"])
+        difficulty = int(data["difficulty"])
+    except (TypeError, ValueError):
+        raise ValueError("category and difficulty must be integers")
+
+    if category not in known_categories:
+        raise ValueError(f"unknown category {category}")
+
+    return {
+        "question": data["question"],
+        "answer": data["answer"],
+        "category": category,
+        "difficulty": difficulty,
+    }
+
+
+def decode_lines(lines):
+    """
+    Decodes binary lines as UTF-8. Invalid bytes are kept as lone surrogates,
+    so read_rows reports the row holding them instead of ending the import.
+    """
+    for line in lines:
+        yield line.decode("utf-8", "surrogateescape")
+
+
+def _is_valid_text(value):
+    try:
+        value.encode("utf-8")
+    except UnicodeEncodeError:
+        return False
+    return True
+
+
+def read_rows(lines, fmt):
+    """
+    Yields (line number, row) from an iterable of text lines in JSON Lines
+    ("jsonl") or CSV ("csv", with a header row). Rows that cannot be parsed
+    are yielded as ValueError instances so they are reported, not fatal.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(lines)
+        for row in reader:
+            if not all(
+                _is_valid_text(value)
+                for value in row.values()
+                if isinstance(value, str)
+            ):
+                yield reader.line_num, ValueError("invalid UTF-8")
+                continue
+            yield reader.line_num, row
+        return
+
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        if not _is_valid_text(line):
+            yield line_number, ValueError("invalid UTF-8")
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except ValueError as e:
+            yield line_number, ValueError(f"invalid JSON: {str(e)}")
+
+
+class ImportReport:
+    def __init__(self):
+        self.inserted = 0
+        self.failed = 0
+        self.errors = []
+        self.categories = set()
+
+    def add_error(self, line, error):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": str(error)})
+
+    def format(self):
+        return {
+            "inserted": self.inserted,
+            "failed": self.failed,
+            "errors": self.errors,
+        }
+
+
+def _insert_batch(batch, report):
+    """
+    Inserts a batch with one executemany. If the database rejects it, the
+    rows are retried one by one so only the offending rows are reported.
+    """
+    try:
+        db.session.execute(insert(Question), [values for _, values in batch])
+        db.session.commit()
+        report.inserted += len(batch)
+    except SQLAlchemyError:
+        db.session.rollback()
+        for line, values in batch:
+            try:
+                db.session.execute(insert(Question), [values])
+                db.session.commit()
+                report.inserted += 1
+            except SQLAlchemyError as e:
+                db.session.rollback()
+                report.add_error(line, e.orig if hasattr(e, "orig") else e)
+
+    report.categories.update(values["category"] for _, values in batch)
+    data_version.bump()
+
+
+def import_questions(lines, fmt="jsonl", batch_size=1000):
+    """
+    Streams questions from `lines` into the database in batches of
+    `batch_size` rows and returns an ImportReport. Invalid rows are recorded
+    and skipped without aborting the load.
+    """
+    known_categories = {row.id for row in db.session.query(Category.id)}
+    report = ImportReport()
+    batch = []
+
+    for line, row in read_rows(lines, fmt):
+        try:
+            if isinstance(row, ValueError):
+                raise row
+            batch.append((line, validate_question(row, known_categories)))
+        except ValueError as e:
+            report.add_error(line, e)
+            continue
+
+        if len(batch) >= batch_size:
+            _insert_batch(batch, report)
+            batch = []
+
+    if batch:
+        _insert_batch(batch, report)
+    return report
@@ -0,0 +1,213 @@
+from collections import Counter, defaultdict
+import threading
+import time
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+from models import db
+
+# Upper bounds (seconds) of the request duration histogram buckets
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Same statement run this many times in one request is reported as N+1
+N_PLUS_ONE_THRESHOLD = 5
+
+
+class EndpointStats:
+    def __init__(self):
+        self.requests = Counter()
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.serialization_seconds = 0.0
+        self.duration_seconds = 0.0
+        self.buckets = [0] * len(DURATION_BUCKETS)
+
+
+class RequestMetrics:
+    """
+    Per-endpoint request counts, SQL statement counts, DB time and JSON
+    serialization time, rendered in the Prometheus text format.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = defaultdict(EndpointStats)
+        self.sources = []
+
+    def record(
+        self, endpoint, method, status, duration, statements, db_seconds, serialize
+    ):
+        with self._lock:
+            stats = self._endpoints[endpoint]
+            stats.requests[(method, status)] += 1
+            stats.statements += statements
+            stats.db_seconds += db_seconds
+            stats.serialization_seconds += serialize
+            stats.duration_seconds += duration
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if duration <= bound:
+                    stats.buckets[i] += 1
+
+    def render(self):
+        lines = [
+            "# HELP trivia_requests_total HTTP requests handled.",
+            "# TYPE trivia_requests_total counter",
+        ]
+        with self._lock:
+            endpoints = sorted(self._endpoints.items())
+            for endpoint, stats in endpoints:
+                for (method, status), count in sorted(stats.requests.items()):
+                    lines.append(
+                        f'trivia_requests_total{{endpoint="{endpoint}",'
+                        f'method="{method}",status="{status}"}} {count}'
+                    )
+
+            for name, attribute, help_text in (
+                ("trivia_db_statements_total", "statements", "SQL statements run."),
+                ("trivia_db_seconds_total", "db_seconds", "Time spent in SQL."),
+                (
+                    "trivia_serialization_seconds_total",
+                    "serialization_seconds",
+                    "Time spent encoding JSON responses.",
+                ),
+            ):
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} counter")
+                for endpoint, stats in endpoints:
+                    value = getattr(stats, attribute)
+                    lines.append(f'{name}{{endpoint="{endpoint}"}} {value}')
+
+            lines.append("# HELP trivia_request_duration_seconds Request latency.")
+            lines.append("# TYPE trivia_request_duration_seconds histogram")
+            for endpoint, stats in endpoints:
+                total = sum(stats.requests.values())
+                for bound, count in zip(DURATION_BUCKETS, stats.buckets):
+                    lines.append(
+                        f"trivia_request_duration_seconds_bucket"
+                        f'{{endpoint="{endpoint}",le="{bound}"}} {count}'
+                    )
+                lines.append(
+                    f"trivia_request_duration_seconds_bucket"
+                    f'{{endpoint="{endpoint}",le="+Inf"}} {total}'
+                )
+                lines.append(
+                    f'trivia_request_duration_seconds_sum{{endpoint="{endpoint}"}} '
+                    f"{stats.duration_seconds}"
+                )
+                lines.append(
+                    f'trivia_request_duration_seconds_count{{endpoint="{endpoint}"}} '
+                    f"{total}"
+                )
+
+        # Extra gauges/counters registered by other subsystems
+        for source in self.sources:
+            lines.extend(source())
+        return "\n".join(lines) + "\n"
+
+
+# Transaction control is not counted, like the driver's implicit BEGIN/COMMIT
+SAVEPOINT_STATEMENTS = ("SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK TO SAVEPOINT")
+
+
+def _is_recorded(statement):
+    return (
+        has_request_context()
+        and "sql_statements" in g
+        and not statement.startswith(SAVEPOINT_STATEMENTS)
+    )
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, many):
+    if _is_recorded(statement):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, many):
+    if _is_recorded(statement):
+        started = conn.info["query_start"].pop()
+        g.sql_seconds += time.perf_counter() - started
+        g.sql_statements[statement] += 1
+
+
+def init_instrumentation(app):
+    """
+    Records statement count, DB time and serialization time per request,
+    adds a Server-Timing header and serves them at /metrics. In debug mode,
+    statements repeated N_PLUS_ONE_THRESHOLD times in a request are logged.
+    Returns the RequestMetrics registry.
+    """
+    metrics = RequestMetrics()
+
+    def listen(engine):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+    # With LAZY_STARTUP the primary engine only exists after the first app context
+    db.on_engine(app, listen)
+    replicas = app.extensions.get("replicas")
+    for engine in replicas.engines if replicas else []:
+        listen(engine)
+
+    # Time JSON encoding by wrapping the provider used by jsonify
+    encode = app.json.response
+
+    def timed_response(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return encode(*args, **kwargs)
+        finally:
+            if has_request_context() and "serialize_seconds" in g:
+                g.serialize_seconds += time.perf_counter() - started
+
+    app.json.response = timed_response
+
+    @app.before_request
+    def start_timing():
+        g.request_started = time.perf_counter()
+        g.sql_statements = Counter()
+        g.sql_seconds = 0.0
+        g.serialize_seconds = 0.0
+
+    @app.after_request
+    def record_timing(response):
+        if "request_started" not in g:
+            return response
+
+        duration = time.perf_counter() - g.request_started
+        statements = sum(g.sql_statements.values())
+        endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+        metrics.record(
+            endpoint,
+            request.method,
+            response.status_code,
+            duration,
+            statements,
+            g.sql_seconds,
+            g.serialize_seconds,
+        )
+
+        response.headers["Server-Timing"] = ", ".join(
+            [
+                f'db;dur={g.sql_seconds * 1000:.2f};desc="{statements} queries"',
+                f"serialize;dur={g.serialize_seconds * 1000:.2f}",
+                f"total;dur={duration * 1000:.2f}",
+            ]
+        )
+
+        if app.debug:
+            for statement, count in g.sql_statements.items():
+                if count >= N_PLUS_ONE_THRESHOLD:
+                    app.logger.warning(
+                        f"Possible N+1 query in {endpoint}: statement ran "
+                        f"{count} times: {statement}"
+                    )
+        return response
+
+    @app.route("/metrics", methods=["GET"])
+    def get_metrics():
+        return app.response_class(
+            metrics.render(), mimetype="text/plain; version=0.0.4"
+        )
+
+    return metrics
@@ -0,0 +1,177 @@
+import cProfile
+from collections import Counter
+import os
+import random
+import re
+import sys
+import threading
+import time
+
+from flask import abort, jsonify, request
+
+
+class StackSampler:
+    """
+    Statistical profiler for one thread. A background thread records the
+    target thread's stack every `interval` seconds, and the result is written
+    in the collapsed-stack format used by flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.stacks = Counter()
+        self._target = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def enable(self):
+        self._target = threading.get_ident()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def disable(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                name = os.path.basename(code.co_filename)
+                stack.append(f"{code.co_name} ({name}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def dump_stats(self, path):
+        with open(path, "w") as output:
+            for stack, count in self.stacks.most_common():
+                output.write(f"{stack} {count}\n")
+
+
+class ProfilingMiddleware:
+    """
+    WSGI middleware that profiles selected requests:
+
+    - requests sending `header` with the value of `token`,
+    - a random `sample_rate` share of all requests,
+    - every request during a window started with `start_window(seconds)`.
+
+    Each profiled request writes a .pstats file (cProfile) or a .collapsed
+    file (sampling profiler) to `output_dir`, named in the X-Profile-Output
+    response header. Requests that are not profiled only pay for these checks.
+
+    One request is profiled at a time: cProfile cannot run two profilers at
+    once on Python 3.12+, so a request arriving while another one is being
+    profiled is served without a profile.
+    """
+
+    def __init__(
+        self,
+        app,
+        output_dir="profiles",
+        sample_rate=0.0,
+        header="X-Profile",
+        token=None,
+        profiler="cprofile",
+        interval=0.005,
+    ):
+        self.app = app
+        self.output_dir = output_dir
+        self.sample_rate = sample_rate
+        self.environ_key = "HTTP_" + header.upper().replace("-", "_")
+        self.token = token
+        self.profiler = profiler
+        self.interval = interval
+        self.window_ends = 0.0
+        self._lock = threading.Lock()
+
+    def start_window(self, seconds):
+        self.window_ends = time.monotonic() + seconds
+
+    def _should_profile(self, environ):
+        value = environ.get(self.environ_key)
+        if value is not None and self.token is not None and value == self.token:
+            return True
+        if self.sample_rate and random.random() < self.sample_rate:
+            return True
+        return self.window_ends > 0 and time.monotonic() < self.window_ends
+
+    def _output_path(self, environ):
+        path = re.sub(r"[^A-Za-z0-9]+", "_", environ.get("PATH_INFO", "")).strip("_")
+        extension = "pstats" if self.profiler == "cprofile" else "collapsed"
+        name = (
+            f"{time.time():.6f}-{environ.get('REQUEST_METHOD', 'GET')}-"
+            f"{path or 'root'}.{extension}"
+        )
+        return os.path.join(self.output_dir, name)
+
+    def __call__(self, environ, start_response):
+        if not self._should_profile(environ) or not self._lock.acquire(blocking=False):
+            return self.app(environ, start_response)
+        try:
+            return self._profile(environ, start_response)
+        finally:
+            self._lock.release()
+
+    def _profile(self, environ, start_response):
+        output_path = self._output_path(environ)
+
+        def profiled_start_response(status, headers, exc_info=None):
+            headers.append(("X-Profile-Output", os.path.basename(output_path)))
+            return start_response(status, headers, exc_info)
+
+        if self.profiler == "cprofile":
+            profile = cProfile.Profile()
+        else:
+            profile = StackSampler(self.interval)
+
+        profile.enable()
+        try:
+            # Consume the body inside the profile so streamed responses count
+            body = list(self.app(environ, profiled_start_response))
+        finally:
+            profile.disable()
+            os.makedirs(self.output_dir, exist_ok=True)
+            profile.dump_stats(output_path)
+        return body
+
+
+def init_profiling(app):
+    """
+    Wraps app.wsgi_app in a ProfilingMiddleware configured from PROFILE_*
+    settings. PROFILE_TOKEN is required, so clients without it can neither
+    trigger profiles nor fill the disk with them. POST /profiling/window with
+    the token in the profile header profiles every request for `seconds`.
+    Returns the middleware.
+    """
+    if not app.config.get("PROFILE_TOKEN"):
+        raise RuntimeError("PROFILING requires a PROFILE_TOKEN")
+
+    middleware = ProfilingMiddleware(
+        app.wsgi_app,
+        output_dir=app.config.get("PROFILE_DIR", "profiles"),
+        sample_rate=app.config.get("PROFILE_SAMPLE_RATE", 0.0),
+        header=app.config.get("PROFILE_HEADER", "X-Profile"),
+        token=app.config.get("PROFILE_TOKEN"),
+        profiler=app.config.get("PROFILER", "cprofile"),
+        interval=app.config.get("PROFILE_INTERVAL", 0.005),
+    )
+    app.wsgi_app = middleware
+
+    @app.route("/profiling/window", methods=["POST"])
+    def start_profiling_window():
+        header = app.config.get("PROFILE_HEADER", "X-Profile")
+        if request.headers.get(header) != middleware.token:
+            abort(404)
+        seconds = (request.get_json(silent=True) or {}).get("seconds", 30)
+        try:
+            seconds = float(seconds)
+        except (TypeError, ValueError):
+            abort(400)
+        middleware.start_window(seconds)
+        return jsonify({"success": True, "seconds": seconds})
+
+    return middleware
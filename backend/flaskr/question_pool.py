@@ -0,0 +1,313 @@
+from array import array
+import bisect
+import math
+import random
+import threading
+import time
+
+from db_replicas import on_primary
+from models import db, Question, QUESTION_COLUMNS
+
+# Give up on rejection sampling after this many misses and filter instead
+MAX_SAMPLE_ATTEMPTS = 16
+
+# Questions in a quiz round; difficulty ramps reach their end at this point
+QUIZ_LENGTH = 5
+
+# Largest batch served by one /quizzes/batch request
+MAX_BATCH_SIZE = 50
+
+# Cached samplers per pool build, cleared when this many are stored
+MAX_SAMPLERS = 1024
+
+# Difficulty levels further than this from the target all get the same
+# weight, so a far-off target never underflows every weight to 0
+MAX_DIFFICULTY_STEPS = 64
+
+
+def choose_id(ids, exclude):
+    """Picks a random id from `ids` that is not in the `exclude` set."""
+    if not ids:
+        return None
+
+    # Cheap path: the excluded ids are usually a small share of the pool
+    for _ in range(MAX_SAMPLE_ATTEMPTS):
+        candidate = ids[random.randrange(len(ids))]
+        if candidate not in exclude:
+            return candidate
+
+    remaining = [question_id for question_id in ids if question_id not in exclude]
+    if not remaining:
+        return None
+    return random.choice(remaining)
+
+
+def difficulty_weight(difficulty, target):
+    """Weight of a difficulty level; it halves for each step from the target."""
+    if target is None or difficulty is None:
+        return 1.0
+    return 0.5 ** min(abs(difficulty - target), MAX_DIFFICULTY_STEPS)
+
+
+def difficulty_target(spec, answered=0):
+    """
+    Target difficulty for the next question. `spec` is a number, or a ramp
+    {"start": 1, "end": 5, "length": 5} that moves from start to end as
+    `answered` goes from 0 to length - 1. Raises ValueError/TypeError on
+    malformed input.
+    """
+    if spec is None or isinstance(spec, (int, float)):
+        return spec
+    start, end = float(spec["start"]), float(spec["end"])
+    length = int(spec.get("length", QUIZ_LENGTH))
+    if length < 1:
+        raise ValueError("length must be positive")
+    progress = min(answered / max(length - 1, 1), 1.0)
+    # Rounded so ramps reuse a handful of cached samplers
+    return round(start + (end - start) * progress, 1)
+
+
+def selection_options(data, answered=0):
+    """
+    Reads the optional weighting fields of a quiz request body: "difficulty"
+    (see difficulty_target) and "category_weights" ({category id: weight}).
+    Returns (difficulty, category_weights) or raises ValueError.
+    """
+    try:
+        difficulty = difficulty_target(data.get("difficulty"), answered)
+        category_weights = {
+            int(category_id): float(weight)
+            for category_id, weight in (data.get("category_weights") or {}).items()
+        }
+    except (AttributeError, KeyError, OverflowError, TypeError) as e:
+        raise ValueError(f"invalid quiz options: {e}")
+    if difficulty is not None and not math.isfinite(difficulty):
+        raise ValueError("difficulty must be a finite number")
+    if any(weight < 0 for weight in category_weights.values()):
+        raise ValueError("category weights must not be negative")
+    # Also rejects NaN and weights whose total overflows
+    if not math.isfinite(sum(category_weights.values())):
+        raise ValueError("category weights must be finite")
+    return difficulty, category_weights
+
+
+class WeightedSampler:
+    """
+    Cumulative-weight array over buckets of questions; each draw is a random
+    number and a binary search, independent of the number of questions.
+    """
+
+    def __init__(self, buckets, weights):
+        self.buckets = []
+        self.cumulative = array("d")
+        total = 0.0
+        for bucket, weight in zip(buckets, weights):
+            if weight > 0:
+                total += weight
+                self.buckets.append(bucket)
+                self.cumulative.append(total)
+        self._weights = dict(zip(buckets, weights))
+
+    def sample(self):
+        if not self.buckets:
+            return None
+        point = random.random() * self.cumulative[-1]
+        # Rounding can put the point on the last total; stay in range
+        index = bisect.bisect_right(self.cumulative, point)
+        return self.buckets[min(index, len(self.buckets) - 1)]
+
+    def without(self, bucket):
+        buckets = [other for other in self.buckets if other != bucket]
+        return WeightedSampler(buckets, [self._weights[other] for other in buckets])
+
+
+class QuestionPool:
+    """
+    In-process index of question ids per category, kept in compact int
+    arrays so a quiz round can pick a question without loading the whole
+    category from the database.
+
+    Ids are also grouped by (category, difficulty) so weighted picks choose
+    a group with a WeightedSampler, then an id within it.
+
+    The index is rebuilt lazily: `invalidate()` marks it stale (called after
+    writes in this process) and `ttl` bounds how long writes made by other
+    workers can go unnoticed.
+    """
+
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._index = None
+        self._built_at = None
+
+    def invalidate(self):
+        self._built_at = None
+
+    def _is_stale(self):
+        if self._built_at is None:
+            return True
+        return self.ttl is not None and time.monotonic() - self._built_at > self.ttl
+
+    def _build(self):
+        with on_primary():
+            self.load(
+                db.session.query(
+                    Question.id, Question.category, Question.difficulty
+                ).order_by(Question.id)
+            )
+
+    def load(self, rows):
+        """Rebuilds the index from (id, category, difficulty) rows ordered by id."""
+        by_category = {}
+        by_group = {}
+        all_ids = array("i")
+        for question_id, category, difficulty in rows:
+            all_ids.append(question_id)
+            by_group.setdefault((category, difficulty), array("i")).append(question_id)
+            # The category foreign key is ON DELETE SET NULL
+            if category is not None:
+                by_category.setdefault(category, array("i")).append(question_id)
+
+        # Samplers belong to this build, so a rebuild drops them with it
+        self._index = (all_ids, by_category, by_group, {})
+        self._built_at = time.monotonic()
+
+    def ids(self, category_id=None):
+        """Returns the id array for a category, or every id when not given."""
+        if self._is_stale():
+            with self._lock:
+                if self._is_stale():
+                    self._build()
+        return self._lookup(category_id)
+
+    def _lookup(self, category_id):
+        all_ids, by_category, _, _ = self._index
+        if category_id is None:
+            return all_ids
+        return by_category.get(int(category_id), array("i"))
+
+    def choose(self, category_id=None, exclude=()):
+        """
+        Picks a random id from the pool that is not in `exclude`, or None
+        when every question has already been used.
+        """
+        return choose_id(self.ids(category_id), exclude)
+
+    def _sampler(self, index, category_id, difficulty, category_weights):
+        _, _, by_group, samplers = index
+        key = (category_id, difficulty, tuple(sorted(category_weights.items())))
+        sampler = samplers.get(key)
+        if sampler is None:
+            groups = [
+                group
+                for group in by_group
+                if category_id is None or group[0] == category_id
+            ]
+            sampler = WeightedSampler(
+                groups,
+                [
+                    # Sized weights keep questions equally likely within a group
+                    len(by_group[group])
+                    * category_weights.get(group[0], 1.0)
+                    * difficulty_weight(group[1], difficulty)
+                    for group in groups
+                ],
+            )
+            if len(samplers) >= MAX_SAMPLERS:
+                samplers.clear()
+            samplers[key] = sampler
+        return sampler
+
+    def pick(
+        self, category_id=None, exclude=(), difficulty=None, category_weights=None
+    ):
+        """
+        Weighted pick from a fresh index: groups are weighted by size, by
+        `category_weights` ({category id: weight}, default 1) and by how close
+        their difficulty is to the `difficulty` target.
+        """
+        if difficulty is None and not category_weights:
+            return choose_id(self._lookup(category_id), exclude)
+
+        index = self._index
+        by_group = index[2]
+        if category_id is not None:
+            category_id = int(category_id)
+        sampler = self._sampler(index, category_id, difficulty, category_weights or {})
+        while True:
+            group = sampler.sample()
+            if group is None:
+                return None
+            question_id = choose_id(by_group[group], exclude)
+            if question_id is not None:
+                return question_id
+            # Every question in this group was used; draw among the others
+            sampler = sampler.without(group)
+
+    def next_question(
+        self, category_id=None, exclude=(), difficulty=None, category_weights=None
+    ):
+        """
+        Returns the chosen `Question` fetched by primary key. Ids removed by
+        another worker since the last rebuild trigger a rebuild and retry.
+        """
+        exclude = {int(question_id) for question_id in exclude}
+        while True:
+            self.ids()
+            question_id = self.pick(category_id, exclude, difficulty, category_weights)
+            if question_id is None:
+                return None
+
+            question = db.session.get(Question, question_id)
+            if question is not None:
+                return question
+
+            exclude.add(question_id)
+            self.invalidate()
+
+    def next_questions(
+        self,
+        count,
+        category_id=None,
+        exclude=(),
+        difficulties=None,
+        category_weights=None,
+    ):
+        """
+        Picks up to `count` distinct ids from the index and fetches their rows
+        in one query, in pick order. `difficulties` holds the difficulty target
+        for each position. Ids deleted since the last rebuild are replaced.
+        """
+        exclude = {int(question_id) for question_id in exclude}
+        chosen = []
+        while len(chosen) < count:
+            self.ids()
+            picked = []
+            for position in range(len(chosen), count):
+                question_id = self.pick(
+                    category_id,
+                    exclude,
+                    difficulties[position] if difficulties else None,
+                    category_weights,
+                )
+                if question_id is None:
+                    break
+                exclude.add(question_id)
+                picked.append(question_id)
+            if not picked:
+                break
+
+            rows = {
+                row[0]: row
+                for row in db.session.query(*QUESTION_COLUMNS).filter(
+                    Question.id.in_(picked)
+                )
+            }
+            chosen.extend(
+                rows[question_id] for question_id in picked if question_id in rows
+            )
+            if len(rows) == len(picked):
+                break
+            self.invalidate()
+        return chosen
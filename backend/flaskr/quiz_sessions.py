@@ -0,0 +1,154 @@
+from array import array
+from collections import OrderedDict
+import random
+import secrets
+import threading
+import time
+
+from .question_pool import QUIZ_LENGTH
+
+
+def draw_questions(ids, length=QUIZ_LENGTH):
+    """
+    Random order of at most `length` ids from a pool id array. Only the
+    drawn ids are copied, so starting a quiz costs the same for any bank size.
+    """
+    return random.sample(ids, min(length, len(ids)))
+
+
+class QuizSession:
+    """The questions drawn for one quiz and a cursor into them."""
+
+    def __init__(self, question_ids):
+        self.question_ids = array("i", question_ids)
+        self.position = 0
+
+    def advance(self):
+        """Returns the next question id, or None once the quiz is over."""
+        if self.position >= len(self.question_ids):
+            return None
+        question_id = self.question_ids[self.position]
+        self.position += 1
+        return question_id
+
+    @property
+    def remaining(self):
+        return len(self.question_ids) - self.position
+
+
+class QuizSessionStore:
+    """
+    Bounded in-process store of quiz sessions. Sessions expire `ttl` seconds
+    after their last use, and the least recently used session is evicted once
+    `max_sessions` is reached. Only usable with a single worker process; use
+    RedisQuizSessionStore to share sessions between workers.
+    """
+
+    def __init__(self, max_sessions=10000, ttl=3600):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._sessions = OrderedDict()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def _evict_expired(self, now):
+        while self._sessions:
+            session_id, (_, last_used) = next(iter(self._sessions.items()))
+            if now - last_used <= self.ttl:
+                break
+            del self._sessions[session_id]
+
+    def create(self, question_ids):
+        """Stores a session playing `question_ids` in order; returns its id."""
+        session_id = secrets.token_urlsafe(16)
+        session = QuizSession(question_ids)
+        now = time.monotonic()
+        with self._lock:
+            self._evict_expired(now)
+            while len(self._sessions) >= self.max_sessions:
+                self._sessions.popitem(last=False)
+            self._sessions[session_id] = (session, now)
+        return session_id
+
+    def advance(self, session_id):
+        """
+        Moves the session cursor forward under the store lock so concurrent
+        requests never receive the same question, and refreshes the TTL.
+        Returns (question id or None when over, remaining), or None when the
+        session is unknown or expired.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._evict_expired(now)
+            entry = self._sessions.pop(session_id, None)
+            if entry is None:
+                return None
+            session = entry[0]
+            self._sessions[session_id] = (session, now)
+            return session.advance(), session.remaining
+
+
+class RedisQuizSessionStore:
+    """
+    Quiz sessions shared by every worker, backed by any client with the
+    redis-py `get`/`set`/`incr`/`expire` interface. A session is two keys:
+    its comma-separated question ids and a counter of questions served,
+    which INCR advances atomically across workers.
+    """
+
+    def __init__(self, client, ttl=3600, prefix="trivia:quiz:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def create(self, question_ids):
+        session_id = secrets.token_urlsafe(16)
+        self.client.set(
+            self.prefix + session_id,
+            ",".join(str(question_id) for question_id in question_ids),
+            ex=self.ttl,
+        )
+        return session_id
+
+    def advance(self, session_id):
+        """Same contract as QuizSessionStore.advance."""
+        key = self.prefix + session_id
+        question_ids = self.client.get(key)
+        if question_ids is None:
+            return None
+        if isinstance(question_ids, bytes):
+            question_ids = question_ids.decode()
+        question_ids = question_ids.split(",") if question_ids else []
+
+        served = self.client.incr(key + ":served")
+        # Also bounds the counter if the session expired since the get
+        self.client.expire(key, self.ttl)
+        self.client.expire(key + ":served", self.ttl)
+        if served > len(question_ids):
+            return None, 0
+        return int(question_ids[served - 1]), len(question_ids) - served
+
+
+def create_quiz_session_store(app):
+    """
+    Builds the store selected by QUIZ_SESSIONS: "memory" (default, one
+    worker process only) or "redis". The Redis store uses
+    QUIZ_SESSION_REDIS_CLIENT when given (e.g. a fake in tests), otherwise
+    connects to QUIZ_SESSION_REDIS_URL.
+    """
+    backend = app.config.get("QUIZ_SESSIONS", "memory")
+    ttl = app.config.get("QUIZ_SESSION_TTL", 3600)
+
+    if backend == "redis":
+        client = app.config.get("QUIZ_SESSION_REDIS_CLIENT")
+        if client is None:
+            import redis  # optional dependency, only needed for this backend
+
+            client = redis.Redis.from_url(app.config["QUIZ_SESSION_REDIS_URL"])
+        return RedisQuizSessionStore(client, ttl=ttl)
+
+    return QuizSessionStore(
+        max_sessions=app.config.get("QUIZ_SESSION_MAX", 10000), ttl=ttl
+    )
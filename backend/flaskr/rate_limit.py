@@ -0,0 +1,81 @@
+from collections import OrderedDict
+import math
+import threading
+import time
+
+from flask import jsonify, request
+
+
+class MemoryRateLimiter:
+    """
+    Token buckets kept in this process, one per (client, endpoint). A bucket
+    holds up to `burst` tokens and refills at `rate` tokens per second; each
+    request takes one. The least recently seen buckets are dropped beyond
+    `max_buckets`, which only makes those clients start again with a full
+    bucket.
+    """
+
+    def __init__(self, max_buckets=100000):
+        self.max_buckets = max_buckets
+        self.limited = 0
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()
+
+    def hit(self, key, rate, burst):
+        """Takes a token; returns 0 when allowed, else seconds until one is free."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated_at) * rate)
+            if tokens >= 1:
+                wait = 0
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rate
+                self.limited += 1
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+def too_many_requests(retry_after):
+    response = jsonify({"success": False, "error": 429, "message": "Too many requests"})
+    response.status_code = 429
+    response.headers["Retry-After"] = str(retry_after)
+    return response
+
+
+def init_rate_limiting(app):
+    """
+    Limits each client (request.remote_addr) per endpoint with a token
+    bucket. RATE_LIMIT is the default (requests per second, burst) for every
+    endpoint and RATE_LIMITS overrides it per endpoint name, where None
+    means no limit. Limited requests get a 429 with Retry-After before the
+    database is touched.
+
+    Returns the MemoryRateLimiter, or None when no limit is configured.
+    """
+    default_limit = app.config.get("RATE_LIMIT")
+    route_limits = app.config.get("RATE_LIMITS", {})
+    if default_limit is None and not any(route_limits.values()):
+        return None
+
+    limiter = MemoryRateLimiter(
+        max_buckets=app.config.get("RATE_LIMIT_MAX_CLIENTS", 100000)
+    )
+
+    @app.before_request
+    def limit_rate():
+        if request.method == "OPTIONS" or request.endpoint is None:
+            return None
+        limit = route_limits.get(request.endpoint, default_limit)
+        if limit is None:
+            return None
+        rate, burst = limit
+        wait = limiter.hit((request.remote_addr, request.endpoint), rate, burst)
+        if wait:
+            return too_many_requests(max(1, math.ceil(wait)))
+
+    return limiter
@@ -0,0 +1,252 @@
+from array import array
+import bisect
+import sys
+import threading
+import time
+
+from db_replicas import on_primary
+from models import db, Category, QUESTION_COLUMNS
+from .question_pool import QuestionPool
+from .search import build_search_index, rank_ids
+
+# Stored in the category column for questions whose category was deleted
+NO_CATEGORY = -1
+
+
+class Snapshot:
+    """
+    Immutable, column-oriented copy of the categories and questions.
+
+    Question columns are parallel arrays ordered by id (ints in arrays,
+    strings interned in lists), so position `i` of every column belongs to
+    the question `ids[i]`. `category_order` holds the positions sorted by
+    category and id, and `category_offsets` maps a category id to its
+    [start, stop) slice of it. Searches and quiz picks use the same index
+    structures as InvertedIndexSearch and QuestionPool, built once here, and
+    so is the `memory` estimate reported by stats().
+    """
+
+    def __init__(self, category_rows, question_rows):
+        self.category_ids = array("i")
+        self.category_types = []
+        for category_id, category_type in category_rows:
+            self.category_ids.append(category_id)
+            self.category_types.append(sys.intern(category_type))
+
+        self.ids = array("i")
+        self.category = array("i")
+        self.difficulty = array("i")
+        self.question = []
+        self.answer = []
+        for question_id, question, answer, category, difficulty in question_rows:
+            self.ids.append(question_id)
+            self.question.append(sys.intern(question))
+            self.answer.append(sys.intern(answer))
+            self.category.append(NO_CATEGORY if category is None else category)
+            self.difficulty.append(difficulty)
+
+        order = sorted(
+            (i for i, category in enumerate(self.category) if category != NO_CATEGORY),
+            key=lambda i: (self.category[i], self.ids[i]),
+        )
+        self.category_order = array("i", order)
+        self.category_offsets = {}
+        for offset, position in enumerate(order):
+            category = self.category[position]
+            start, _ = self.category_offsets.get(category, (offset, offset))
+            self.category_offsets[category] = (start, offset + 1)
+
+        self.search_index = build_search_index(zip(self.ids, self.question))
+
+        # A pool that never goes stale: the snapshot is replaced instead
+        self.pool = QuestionPool(ttl=None)
+        self.pool.load(
+            (question_id, None if category == NO_CATEGORY else category, difficulty)
+            for question_id, category, difficulty in zip(
+                self.ids, self.category, self.difficulty
+            )
+        )
+        self.built_at = time.time()
+        self.memory = self._memory_report()
+
+    @classmethod
+    def from_database(cls):
+        categories = db.session.query(Category.id, Category.type).order_by(Category.id)
+        questions = db.session.query(*QUESTION_COLUMNS).order_by(QUESTION_COLUMNS[0])
+        return cls(categories.all(), questions.all())
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _row(self, position):
+        category = self.category[position]
+        return (
+            self.ids[position],
+            self.question[position],
+            self.answer[position],
+            None if category == NO_CATEGORY else category,
+            self.difficulty[position],
+        )
+
+    def _position(self, question_id):
+        position = bisect.bisect_left(self.ids, question_id)
+        if position < len(self.ids) and self.ids[position] == question_id:
+            return position
+        return None
+
+    def categories(self):
+        return dict(zip(self.category_ids, self.category_types))
+
+    def page(self, page=1, after_id=None, per_page=10):
+        """Rows of one page ordered by id, like page_selection."""
+        if after_id is not None:
+            start = bisect.bisect_right(self.ids, after_id)
+        else:
+            start = (max(page, 1) - 1) * per_page
+        stop = min(start + per_page, len(self.ids))
+        return [self._row(position) for position in range(start, stop)]
+
+    def category_rows(self, category_id):
+        start, stop = self.category_offsets.get(category_id, (0, 0))
+        return [self._row(self.category_order[i]) for i in range(start, stop)]
+
+    def search(self, term, offset, limit):
+        """Same contract and ranking as InvertedIndexSearch.search."""
+        question_ids = rank_ids(self.search_index, term)
+        return len(question_ids), [
+            self._row(self._position(question_id))
+            for question_id in question_ids[offset : offset + limit]
+        ]
+
+    def next_question(
+        self, category_id=None, exclude=(), difficulty=None, category_weights=None
+    ):
+        """A quiz question formatted like Question.format(), or None."""
+        exclude = {int(question_id) for question_id in exclude}
+        question_id = self.pool.pick(category_id, exclude, difficulty, category_weights)
+        if question_id is None:
+            return None
+        question_id, question, answer, category, difficulty = self._row(
+            self._position(question_id)
+        )
+        return {
+            "id": question_id,
+            "question": question,
+            "answer": answer,
+            "category": category,
+            "difficulty": difficulty,
+        }
+
+    def _memory_report(self):
+        """Approximate bytes held by the snapshot, by structure."""
+        columns = sum(
+            sys.getsizeof(column)
+            for column in (
+                self.category_ids,
+                self.ids,
+                self.category,
+                self.difficulty,
+                self.category_order,
+            )
+        )
+        # Each distinct string once, plus the lists pointing at them
+        distinct = {id(s): s for s in self.category_types + self.question + self.answer}
+        strings = sum(sys.getsizeof(s) for s in distinct.values()) + sum(
+            sys.getsizeof(column)
+            for column in (self.category_types, self.question, self.answer)
+        )
+        postings, texts = self.search_index
+        search = (
+            sys.getsizeof(postings)
+            + sum(sys.getsizeof(t) + sys.getsizeof(ids) for t, ids in postings.items())
+            + sys.getsizeof(texts)
+            + sum(sys.getsizeof(text) for text in texts.values())
+        )
+        all_ids, by_category, by_group, _ = self.pool._index
+        quiz = (
+            sum(
+                sys.getsizeof(ids)
+                for ids in [all_ids, *by_category.values(), *by_group.values()]
+            )
+            + sys.getsizeof(by_category)
+            + sys.getsizeof(by_group)
+        )
+        offsets = sys.getsizeof(self.category_offsets)
+        return {
+            "columns": columns + offsets,
+            "strings": strings,
+            "search_index": search,
+            "quiz_index": quiz,
+            "total": columns + offsets + strings + search + quiz,
+        }
+
+
+class ReadModel:
+    """
+    Holds the current Snapshot and replaces it copy-on-write: a new snapshot
+    is built aside and swapped in with one assignment, so a request keeps
+    reading the snapshot it started with.
+
+    Once the snapshot is stale, after `invalidate()` (writes in this process)
+    or `ttl` seconds (writes made by other workers), the next request builds
+    a new one while concurrent requests keep reading the old one. Only the
+    very first load makes readers wait.
+    """
+
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self.builds = 0
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._dirty = True
+        self._built_at = None
+
+    def invalidate(self):
+        self._dirty = True
+
+    def refresh(self):
+        with self._lock:
+            self._rebuild()
+        return self._snapshot
+
+    def _rebuild(self):
+        # Cleared first: a write during the build marks the new snapshot dirty
+        self._dirty = False
+        with on_primary():
+            snapshot = Snapshot.from_database()
+        self._snapshot = snapshot
+        self._built_at = time.monotonic()
+        self.builds += 1
+
+    def _stale(self):
+        return self._dirty or (
+            self.ttl is not None and time.monotonic() - self._built_at > self.ttl
+        )
+
+    def current(self):
+        """The snapshot to serve this request from."""
+        if self._snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    self._rebuild()
+        elif self._stale() and self._lock.acquire(blocking=False):
+            # The lock only picks the builder; readers never wait for it
+            try:
+                if self._stale():
+                    self._rebuild()
+            finally:
+                self._lock.release()
+        return self._snapshot
+
+    def stats(self):
+        snapshot = self._snapshot
+        if snapshot is None:
+            return {"loaded": False, "builds": self.builds}
+        return {
+            "loaded": True,
+            "builds": self.builds,
+            "questions": len(snapshot),
+            "categories": len(snapshot.category_ids),
+            "age": round(time.time() - snapshot.built_at, 3),
+            "memory_bytes": snapshot.memory,
+        }
@@ -0,0 +1,170 @@
+import functools
+import random
+import threading
+import time
+
+from flask import current_app, g, has_request_context, jsonify, request
+from sqlalchemy import event, text
+from sqlalchemy.exc import DBAPIError, SQLAlchemyError
+from werkzeug.exceptions import HTTPException
+
+from models import db
+
+# Postgres errors worth running the request again for: serialization
+# failures, deadlocks and the server dropping or refusing connections
+TRANSIENT_PGCODES = {
+    "40001",
+    "40P01",
+    "57P01",
+    "57P02",
+    "57P03",
+    "08000",
+    "08003",
+    "08006",
+}
+
+# Postgres query_canceled, raised when statement_timeout is exceeded
+STATEMENT_TIMEOUT_PGCODE = "57014"
+
+
+class ResilienceStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.shed = 0
+        self.retries = 0
+        self.timeouts = 0
+
+    def increment(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def format(self):
+        return {"shed": self.shed, "retries": self.retries, "timeouts": self.timeouts}
+
+
+def _pgcode(error):
+    orig = getattr(error, "orig", None)
+    return getattr(orig, "pgcode", None) or getattr(orig, "sqlstate", None)
+
+
+def is_transient(error):
+    """True for DB errors where running the same request again can succeed."""
+    if not isinstance(error, DBAPIError):
+        return False
+    if error.connection_invalidated:
+        return True
+    if _pgcode(error) in TRANSIENT_PGCODES:
+        return True
+    # SQLite reports lock contention between writers this way
+    return "database is locked" in str(error.orig)
+
+
+def retry_transient(view):
+    """
+    Runs the view again, after rolling back, when it fails with a transient
+    DB error. Allows DB_RETRIES extra attempts (default 2) with jittered
+    exponential backoff starting at DB_RETRY_BACKOFF seconds (default 0.05).
+    Only use it on views that are safe to repeat.
+    """
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        retries = current_app.config.get("DB_RETRIES", 2)
+        backoff = current_app.config.get("DB_RETRY_BACKOFF", 0.05)
+        for attempt in range(retries + 1):
+            try:
+                return view(*args, **kwargs)
+            except DBAPIError as e:
+                if attempt == retries or not is_transient(e):
+                    raise
+                db.session.rollback()
+                current_app.extensions["resilience"].increment("retries")
+                current_app.logger.warning(
+                    f"Retrying {request.endpoint} after transient error: {e.orig}"
+                )
+                time.sleep(backoff * 2**attempt * random.uniform(0.5, 1.5))
+
+    return wrapper
+
+
+def _apply_statement_timeout(session, transaction, connection):
+    # Runs as each transaction begins, so cached responses never touch the DB
+    if not has_request_context() or connection.dialect.name != "postgresql":
+        return
+    timeout = g.get("statement_timeout")
+    if timeout:
+        connection.execute(
+            text("SELECT set_config('statement_timeout', :timeout, true)"),
+            {"timeout": str(timeout)},
+        )
+
+
+def service_unavailable(message, retry_after=1):
+    response = jsonify({"success": False, "error": 503, "message": message})
+    response.status_code = 503
+    response.headers["Retry-After"] = str(retry_after)
+    return response
+
+
+def init_resilience(app):
+    """
+    Central error handling for all routes, plus:
+
+    - load shedding: once MAX_CONCURRENT_REQUESTS requests are in progress in
+      this process, further requests get a 503 with Retry-After right away,
+    - statement timeouts: STATEMENT_TIMEOUT milliseconds, or the value for the
+      endpoint in STATEMENT_TIMEOUTS, set as Postgres statement_timeout for
+      each transaction of the request. A timed out statement returns a 503.
+
+    Returns the ResilienceStats counters.
+    """
+    stats = ResilienceStats()
+    app.extensions["resilience"] = stats
+
+    limit = app.config.get("MAX_CONCURRENT_REQUESTS")
+    slots = threading.BoundedSemaphore(limit) if limit else None
+    default_timeout = app.config.get("STATEMENT_TIMEOUT")
+    route_timeouts = app.config.get("STATEMENT_TIMEOUTS", {})
+
+    if not event.contains(db.session, "after_begin", _apply_statement_timeout):
+        event.listen(db.session, "after_begin", _apply_statement_timeout)
+
+    @app.before_request
+    def admit_request():
+        if slots is not None:
+            if not slots.acquire(blocking=False):
+                stats.increment("shed")
+                return service_unavailable("Server is busy")
+            g.holds_slot = True
+        g.statement_timeout = route_timeouts.get(request.endpoint, default_timeout)
+
+    @app.teardown_request
+    def release_slot(exc):
+        if g.pop("holds_slot", False):
+            slots.release()
+
+    @app.errorhandler(SQLAlchemyError)
+    def database_error(error):
+        db.session.rollback()
+        if _pgcode(error) == STATEMENT_TIMEOUT_PGCODE:
+            stats.increment("timeouts")
+            app.logger.warning(f"Statement timeout in {request.endpoint}")
+            return service_unavailable("Database timeout")
+
+        # Log the DB error
+        app.logger.error(f"Database error: {str(error)}")
+        return jsonify({"success": False, "error": "A database error occurred"}), 500
+
+    @app.errorhandler(Exception)
+    def unexpected_error(error):
+        if isinstance(error, HTTPException):
+            # Let aborts without a dedicated handler keep their status
+            return error
+
+        app.logger.error(f"Unexpected error: {str(error)}")
+        return (
+            jsonify({"success": False, "error": "An unexpected error occurred"}),
+            500,
+        )
+
+    return stats
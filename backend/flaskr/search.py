@@ -0,0 +1,152 @@
+from array import array
+import re
+import threading
+import time
+
+from sqlalchemy import func, literal_column, or_
+from db_replicas import on_primary
+from models import db, Question, QUESTION_COLUMNS
+
+TOKEN_RE = re.compile(r"\w+")
+
+# Must match the expression in migrations/0001_question_search_indexes.sql so
+# Postgres can use the GIN index
+SEARCH_CONFIG = literal_column("'english'::regconfig")
+
+
+def _fetch_in_order(question_ids):
+    rows = (
+        db.session.query(*QUESTION_COLUMNS).filter(Question.id.in_(question_ids)).all()
+    )
+    by_id = {row[0]: row for row in rows}
+    return [by_id[i] for i in question_ids if i in by_id]
+
+
+def fulltext_criteria(term):
+    """
+    Returns the WHERE clause and rank expression of a Postgres search for
+    `term`: a `tsvector` match (GIN index) or the original case-insensitive
+    substring (pg_trgm index).
+    """
+    document = func.to_tsvector(SEARCH_CONFIG, Question.question)
+    query = func.plainto_tsquery(SEARCH_CONFIG, term)
+    criteria = or_(document.op("@@")(query), Question.question.ilike(f"%{term}%"))
+    return criteria, func.ts_rank(document, query)
+
+
+class FullTextSearch:
+    """Postgres search using `fulltext_criteria`, ranked by `ts_rank`."""
+
+    def invalidate(self):
+        pass
+
+    def search(self, term, offset, limit):
+        criteria, rank = fulltext_criteria(term)
+        total = db.session.query(func.count(Question.id)).filter(criteria).scalar()
+        questions = (
+            db.session.query(*QUESTION_COLUMNS)
+            .filter(criteria)
+            .order_by(rank.desc(), Question.id)
+            .offset(offset)
+            .limit(limit)
+            .all()
+        )
+        return total, questions
+
+
+def build_search_index(rows):
+    """
+    Builds (postings, texts) from (id, question) rows: a token -> ids map
+    plus the lowercased text of each question.
+    """
+    postings = {}
+    texts = {}
+    for question_id, question in rows:
+        text = question.lower()
+        texts[question_id] = text
+        for token in set(TOKEN_RE.findall(text)):
+            postings.setdefault(token, array("i")).append(question_id)
+    return postings, texts
+
+
+def rank_ids(index, term):
+    """
+    Ids of the questions containing `term` (case-insensitive substring),
+    those with the search words as whole words first, then by id.
+    """
+    postings, texts = index
+    needle = term.lower()
+    words = TOKEN_RE.findall(needle)
+
+    # Narrow the candidates through the vocabulary, which is much smaller
+    # than the question bank, then confirm the full substring match
+    candidates = None
+    for word in words:
+        matches = set()
+        for token, ids in postings.items():
+            if word in token:
+                matches.update(ids)
+        candidates = matches if candidates is None else candidates & matches
+    if candidates is None:
+        candidates = texts.keys()
+
+    found = [i for i in candidates if needle in texts[i]]
+    exact = [set(postings.get(word, ())) for word in words]
+    return sorted(found, key=lambda i: (-sum(i in ids for ids in exact), i))
+
+
+class InvertedIndexSearch:
+    """
+    Pure-Python fallback for SQLite and tests, using `build_search_index`
+    and `rank_ids`. It ranks questions that contain the search words as
+    whole words above partial matches.
+    """
+
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._index = None
+        self._built_at = None
+
+    def invalidate(self):
+        self._built_at = None
+
+    def _is_stale(self):
+        if self._built_at is None:
+            return True
+        return self.ttl is not None and time.monotonic() - self._built_at > self.ttl
+
+    def _build(self):
+        with on_primary():
+            rows = db.session.query(Question.id, Question.question).order_by(
+                Question.id
+            )
+            self._index = build_search_index(rows)
+        self._built_at = time.monotonic()
+
+    def ranked_ids(self, term):
+        if self._is_stale():
+            with self._lock:
+                if self._is_stale():
+                    self._build()
+        return rank_ids(self._index, term)
+
+    def search(self, term, offset, limit):
+        question_ids = self.ranked_ids(term)
+        return len(question_ids), _fetch_in_order(question_ids[offset : offset + limit])
+
+
+def create_search_backend(app):
+    """
+    Picks the search backend from SEARCH_BACKEND ("fulltext" or "inverted"),
+    defaulting to full-text search on Postgres and the in-memory index
+    elsewhere.
+    """
+    backend = app.config.get("SEARCH_BACKEND")
+    if backend is None:
+        uri = app.config.get("SQLALCHEMY_DATABASE_URI") or ""
+        backend = "fulltext" if uri.startswith("postgres") else "inverted"
+
+    if backend == "fulltext":
+        return FullTextSearch()
+    return InvertedIndexSearch(ttl=app.config.get("SEARCH_INDEX_TTL", 60))
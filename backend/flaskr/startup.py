@@ -0,0 +1,93 @@
+import json
+import threading
+import time
+
+import click
+from flask import jsonify
+
+
+class StartupReport:
+    """
+    Where the startup time of one app goes: the module imports, when the
+    entry point measured them, and the phases of create_app, each recorded
+    with `mark(name)` as the time since the previous mark.
+    `set_ready()` is called once the optional warm-up is over, and prints
+    the report to stderr when `echo` is set.
+    """
+
+    def __init__(self, imports=None, echo=False):
+        self.imports = dict(imports or {})
+        self.echo = echo
+        self.phases = {}
+        self.ready = threading.Event()
+        self.error = None
+        self._last = time.perf_counter()
+
+    def record(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0) + seconds
+
+    def mark(self, name):
+        now = time.perf_counter()
+        self.record(name, now - self._last)
+        self._last = now
+
+    def format(self):
+        imports = {name: round(s * 1000, 2) for name, s in self.imports.items()}
+        phases = {name: round(s * 1000, 2) for name, s in self.phases.items()}
+        report = {
+            "imports_ms": imports,
+            "init_ms": phases,
+            "total_ms": round(imports.get("total", 0) + sum(phases.values()), 2),
+            "ready": self.ready.is_set(),
+        }
+        if self.error is not None:
+            report["warm_up_error"] = self.error
+        return report
+
+    def set_ready(self):
+        self.ready.set()
+        if self.echo:
+            click.echo(f"Startup report: {json.dumps(self.format())}", err=True)
+
+
+def run_warm_up(app, report, warm_up):
+    """
+    Runs `warm_up()` in an app context, records it in the report and marks
+    the app ready. A failure is logged and reported but still marks it
+    ready: the app then opens connections and loads data on demand.
+    """
+    started = time.perf_counter()
+    try:
+        with app.app_context():
+            warm_up()
+    except Exception as e:
+        report.error = str(e)
+        app.logger.warning(f"Warm-up failed: {str(e)}")
+    report.record("warm_up", time.perf_counter() - started)
+    report.set_ready()
+
+
+def start_warm_up(app, report, warm_up, background=False):
+    if not background:
+        run_warm_up(app, report, warm_up)
+        return
+    threading.Thread(
+        target=run_warm_up, args=(app, report, warm_up), name="warm-up", daemon=True
+    ).start()
+
+
+def readiness(report):
+    """Body of GET /ready: 200 once warmed up, else 503 with Retry-After."""
+    if report.ready.is_set():
+        return jsonify({"success": True, "startup": report.format()})
+    response = jsonify(
+        {
+            "success": False,
+            "error": 503,
+            "message": "Warming up",
+            "startup": report.format(),
+        }
+    )
+    response.status_code = 503
+    response.headers["Retry-After"] = "1"
+    return response
@@ -0,0 +1,15 @@
+--
+-- Indexes for POST /questions/search
+--
+-- Run with: psql trivia < migrations/0001_question_search_indexes.sql
+--
+
+-- Ranked full-text search on the question text
+CREATE INDEX IF NOT EXISTS questions_question_fts_idx
+    ON public.questions USING GIN (to_tsvector('english'::regconfig, question));
+
+-- Trigram index so the substring (ILIKE '%term%') match can use an index
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS questions_question_trgm_idx
+    ON public.questions USING GIN (question public.gin_trgm_ops);
@@ -0,0 +1,15 @@
+--
+-- Indexes for category browsing and quizzes
+--
+-- Run with: psql trivia < migrations/0002_question_category_indexes.sql
+-- (CONCURRENTLY avoids locking writes, so do not wrap this file in a
+-- transaction)
+--
+
+-- GET /categories/<id>/questions and per-category counts
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_questions_category
+    ON public.questions (category);
+
+-- Quiz selection by category and difficulty
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_questions_category_difficulty
+    ON public.questions (category, difficulty);
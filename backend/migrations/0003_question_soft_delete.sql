@@ -0,0 +1,22 @@
+--
+-- Soft deletes (SOFT_DELETE) and the partial indexes that go with them
+--
+-- Run with: psql trivia < migrations/0003_question_soft_delete.sql
+-- (CONCURRENTLY avoids locking writes, so do not wrap this file in a
+-- transaction)
+--
+
+-- Set instead of deleting the row; NULL for live questions. Adding a
+-- nullable column without a default does not rewrite the table
+ALTER TABLE public.questions ADD COLUMN IF NOT EXISTS deleted_at timestamp;
+
+-- Quiz selection by category and difficulty, among live questions only.
+-- ix_questions_category_difficulty (migration 0002) stays: queries only
+-- filter on deleted_at with SOFT_DELETE on, so without it they need the
+-- full index
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_questions_live_category_difficulty
+    ON public.questions (category, difficulty) WHERE deleted_at IS NULL;
+
+-- The purge job finds soft-deleted rows without scanning live ones
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_questions_deleted_at
+    ON public.questions (deleted_at) WHERE deleted_at IS NOT NULL;
@@ -1,31 +1,154 @@
-from sqlalchemy import Column, String, Integer
+from datetime import datetime, timezone
+from sqlalchemy import (
+    Column,
+    DateTime,
+    FetchedValue,
+    String,
+    Integer,
+    ForeignKey,
+    Index,
+    event,
+    text,
+)
+from sqlalchemy.orm import Session, deferred, with_loader_criteria
+from flask import appcontext_pushed, current_app, has_app_context
 from flask_sqlalchemy import SQLAlchemy
 from dotenv import load_dotenv
+from db_pool import engine_options
+from db_replicas import RoutingSession, create_replica_router
+import functools
 import os
+import threading
+import uuid
+import weakref
 
-# Load environment variables from .env file
-load_dotenv()
+"""
+default_database_path()
+    the Postgres URI built from DB_NAME, DB_USER, DB_PASS and DB_HOST. The
+    .env file is loaded on the first call rather than at import time.
+"""
 
-database_name = os.getenv("DB_NAME")
-database_user = os.getenv("DB_USER")
-database_password = os.getenv("DB_PASS")
-database_host = os.getenv("DB_HOST")
-database_path = (
-    f"postgresql://{database_user}:{database_password}@{database_host}/{database_name}"
-)
 
-db = SQLAlchemy()
+@functools.cache
+def load_environment():
+    # Load environment variables from .env file
+    load_dotenv()
+
+
+def default_database_path():
+    load_environment()
+    database_name = os.getenv("DB_NAME")
+    database_user = os.getenv("DB_USER")
+    database_password = os.getenv("DB_PASS")
+    database_host = os.getenv("DB_HOST")
+    return f"postgresql://{database_user}:{database_password}@{database_host}/{database_name}"
+
+
+"""
+LazySQLAlchemy
+    `init_app_lazily(app)` postpones init_app, and with it the engine (DBAPI
+    driver import, pool), until the app's first app context, usually the
+    first request or the warm-up. on_engine() defers setup that needs the
+    engine until then.
+"""
+
+
+class LazySQLAlchemy(SQLAlchemy):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._engine_lock = threading.Lock()
+        # App -> on_engine callbacks, for apps not initialized yet
+        self._pending = weakref.WeakKeyDictionary()
+
+    def init_app_lazily(self, app):
+        self._pending[app] = []
+        appcontext_pushed.connect(self._init_pending, app)
+
+    def _init_pending(self, app, **kwargs):
+        if app not in self._pending:
+            return
+        with self._engine_lock:
+            callbacks = self._pending.get(app)
+            if callbacks is None:
+                return
+            self.init_app(app)
+            engine = self.engines[None]
+            for callback in callbacks:
+                try:
+                    callback(engine)
+                except Exception:
+                    # Raising from appcontext_pushed would leave the context
+                    # pushed, so the error is logged instead
+                    app.logger.exception("Engine setup failed")
+            # Removed last, so no other context uses the app before the callbacks
+            del self._pending[app]
+        appcontext_pushed.disconnect(self._init_pending, app)
+
+    def on_engine(self, app, callback):
+        """Calls callback(engine) with the app's default engine once it exists."""
+        with self._engine_lock:
+            if app in self._pending:
+                self._pending[app].append(callback)
+                return
+        with app.app_context():
+            callback(self.engines[None])
+
+
+db = LazySQLAlchemy(session_options={"class_": RoutingSession})
+
+"""
+DataVersion
+    counter bumped on every question write, used to build ETags. The token is
+    drawn on first use in each process id, so workers forked from a preloaded
+    app (gunicorn --preload) get their own, and a validator issued by one
+    worker never matches in another.
+"""
+
+
+class DataVersion:
+    def __init__(self):
+        self.value = 0
+        self._token = None
+        self._pid = None
+
+    @property
+    def token(self):
+        if self._pid != os.getpid():
+            self._token = uuid.uuid4().hex[:8]
+            self._pid = os.getpid()
+        return self._token
+
+    def bump(self):
+        self.value += 1
+
+    def __str__(self):
+        return f"{self.token}-{self.value}"
+
+
+data_version = DataVersion()
 
 """
 setup_db(app)
-    binds a flask application and a SQLAlchemy service
+    binds a flask application and a SQLAlchemy service, plus the read
+    replicas when any are configured
 """
 
 
-def setup_db(app, database_path=database_path):
+def setup_db(app, database_path=None):
+    load_environment()
+    if database_path is None:
+        database_path = default_database_path()
     app.config["SQLALCHEMY_DATABASE_URI"] = database_path
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-    db.init_app(app)
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+        **engine_options(app.config, database_path),
+        **app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {}),
+    }
+    if app.config.get("LAZY_STARTUP"):
+        db.init_app_lazily(app)
+    else:
+        db.init_app(app)
+    app.extensions["replicas"] = create_replica_router(app.config)
 
 
 """
@@ -35,12 +158,46 @@ Question
 
 class Question(db.Model):
     __tablename__ = "questions"
+    # Don't read deleted_at back after inserts
+    __mapper_args__ = {"eager_defaults": False}
 
     id = Column(Integer, primary_key=True)
     question = Column(String, nullable=False)
     answer = Column(String, nullable=False)
-    category = Column(String, nullable=False)
+    category = Column(
+        Integer,
+        ForeignKey("categories.id", onupdate="CASCADE", ondelete="SET NULL"),
+        index=True,
+    )
     difficulty = Column(Integer, nullable=False)
+    # Set by soft deletes (UTC); with SOFT_DELETE such rows are hidden from
+    # every ORM query. Deferred and marked as server-set, so ORM selects and
+    # inserts leave it out and databases without migration 0003 work while
+    # the setting is off
+    deleted_at = deferred(Column(DateTime, server_default=FetchedValue()))
+
+    category_ref = db.relationship("Category", back_populates="questions")
+
+    # Category browsing and quizzes filter on category (and difficulty), among
+    # live rows only with SOFT_DELETE; the purge job scans soft-deleted ones.
+    # See migrations/0002_question_category_indexes.sql and
+    # migrations/0003_question_soft_delete.sql
+    __table_args__ = (
+        Index("ix_questions_category_difficulty", "category", "difficulty"),
+        Index(
+            "ix_questions_live_category_difficulty",
+            "category",
+            "difficulty",
+            postgresql_where=text("deleted_at IS NULL"),
+            sqlite_where=text("deleted_at IS NULL"),
+        ),
+        Index(
+            "ix_questions_deleted_at",
+            "deleted_at",
+            postgresql_where=text("deleted_at IS NOT NULL"),
+            sqlite_where=text("deleted_at IS NOT NULL"),
+        ),
+    )
 
     def __init__(self, question, answer, category, difficulty):
         self.question = question
@@ -51,6 +208,7 @@ class Question(db.Model):
     def insert(self):
         db.session.add(self)
         db.session.commit()
+        data_version.bump()
 
     def update(self):
         db.session.commit()
@@ -58,6 +216,7 @@ class Question(db.Model):
     def delete(self):
         db.session.delete(self)
         db.session.commit()
+        data_version.bump()
 
     def format(self):
         return {
@@ -69,6 +228,54 @@ class Question(db.Model):
         }
 
 
+def utcnow():
+    """Naive UTC timestamp, comparable on every database."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _hide_deleted_questions(execute_state):
+    # With SOFT_DELETE, adds "deleted_at IS NULL" wherever Question appears
+    # in an ORM select, unless the statement opts out with include_deleted=True
+    if (
+        has_app_context()
+        and current_app.config.get("SOFT_DELETE", False)
+        and execute_state.is_select
+        and not execute_state.is_column_load
+        and not execute_state.is_relationship_load
+        and not execute_state.execution_options.get("include_deleted", False)
+    ):
+        execute_state.statement = execute_state.statement.options(
+            with_loader_criteria(
+                Question, Question.deleted_at.is_(None), include_aliases=True
+            )
+        )
+
+
+# Columns selected by list endpoints that skip ORM object hydration
+QUESTION_COLUMNS = (
+    Question.id,
+    Question.question,
+    Question.answer,
+    Question.category,
+    Question.difficulty,
+)
+
+
+def format_question_rows(rows):
+    """Formats rows selected with QUESTION_COLUMNS like Question.format()."""
+    return [
+        {
+            "id": id,
+            "question": question,
+            "answer": answer,
+            "category": category,
+            "difficulty": difficulty,
+        }
+        for id, question, answer, category, difficulty in rows
+    ]
+
+
 """
 Category
 """
@@ -80,6 +287,10 @@ class Category(db.Model):
     id = Column(Integer, primary_key=True)
     type = Column(String, nullable=False)
 
+    questions = db.relationship(
+        "Question", back_populates="category_ref", lazy="dynamic"
+    )
+
     def __init__(self, type):
         self.type = type
 
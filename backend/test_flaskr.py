@@ -1,87 +1,128 @@
-from sqlalchemy import inspect, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy import text
+from sqlalchemy.orm import Query
+from sqlalchemy.pool import NullPool
+import csv
+import io
+import gzip
 import os
+import shutil
+import threading
+import time
 import unittest
+from unittest import mock
 import json
+import flaskr.compression
 from flaskr import create_app
+from flask_sqlalchemy.record_queries import get_recorded_queries
 from models import db, Question, Category
-import subprocess
+from flaskr.question_pool import QuestionPool
+from flaskr.read_model import ReadModel, Snapshot
+from flaskr.cache import LRUCache, RedisCache, SingleFlight
+import tempfile
 from dotenv import load_dotenv
+from fixtures import SeededDatabase
+from db_pool import async_engine_options
+from wsgi import create_wsgi_app
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    from starlette.testclient import TestClient
+    from flaskr.asgi import create_asgi_app
+except ImportError:
+    TestClient = None
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Seeded once per process (per worker under pytest-xdist)
+TEST_DATABASE = SeededDatabase()
+
+
+class FakeRedis:
+    """In-memory stand-in for the redis-py calls the app makes."""
+
+    def __init__(self):
+        self.values = {}
+        self.expires = {}
+        self.clock = time.monotonic
+
+    def _live(self, key):
+        expires_at = self.expires.get(key)
+        if expires_at is not None and self.clock() >= expires_at:
+            self.values.pop(key, None)
+            self.expires.pop(key, None)
+        return key in self.values
+
+    def get(self, key):
+        return self.values[key] if self._live(key) else None
+
+    def mget(self, *keys):
+        return [self.get(key) for key in keys]
+
+    def set(self, key, value, ex=None):
+        if isinstance(value, str):
+            value = value.encode()
+        self.values[key] = value
+        self.expires.pop(key, None)
+        if ex is not None:
+            self.expire(key, ex)
+
+    def delete(self, *keys):
+        for key in keys:
+            self.values.pop(key, None)
+            self.expires.pop(key, None)
+
+    def incr(self, key):
+        value = int(self.get(key) or 0) + 1
+        self.values[key] = str(value).encode()
+        return value
+
+    def expire(self, key, seconds):
+        if self._live(key):
+            self.expires[key] = self.clock() + seconds
 
 
 class TriviaTestCase(unittest.TestCase):
     """This class represents the trivia test case"""
 
-    # Load environment variables from .env file
-    load_dotenv()
+    @classmethod
+    def setUpClass(cls):
+        """Load the schema and seed data once for the whole run."""
+        TEST_DATABASE.load()
 
     def setUp(self):
         """Define test variables and initialize app."""
-        self.database_name = os.getenv("DB_NAME_TEST")
-        self.database_user = os.getenv("DB_USER_TEST")
-        self.database_password = os.getenv("DB_PASS_TEST")
-        self.database_host = os.getenv("DB_HOST_TEST")
-        self.database_path = f"postgresql://{self.database_user}:{self.database_password}@{self.database_host}/{self.database_name}"
-
-        # Path to the trivia.psql file
-        base_dir = os.path.dirname(
-            os.path.abspath(__file__)
-        )  # Directory of this script
-        psql_file_path = os.path.join(base_dir, "trivia.psql")
-
-        # load test db with data
-        try:
-            # Load the initial test data
-            with open(psql_file_path, "r") as psql_file:
-                subprocess.run(
-                    ["psql", self.database_name],
-                    stdin=psql_file,
-                    check=True,
-                )
-        except subprocess.CalledProcessError as e:
-            print(f"Error setting up the test database: {e}")
-            raise
+        self.database_path = TEST_DATABASE.url
+        self.app = self.make_app()
+        self.client = self.app.test_client()
 
-        # Create app with the test configuration
-        self.app = create_app(
+    def make_app(self, config=None):
+        """
+        Create an app with the test configuration plus `config`, running
+        inside this test's rolled back transaction.
+        """
+        app = create_app(
             {
                 "SQLALCHEMY_DATABASE_URI": self.database_path,
                 "SQLALCHEMY_TRACK_MODIFICATIONS": False,
                 "TESTING": True,
+                **(config or {}),
             }
         )
-        self.client = self.app.test_client()
-
-        # Bind the app to the current context and create all tables
-        with self.app.app_context():
-            db.create_all()
-
-    from sqlalchemy import inspect, text
+        TEST_DATABASE.bind(app)
+        return app
 
     def tearDown(self):
         """
         Executed after each test.
-        Drop all relations.
+        Roll back everything the test wrote.
         """
-        with self.app.app_context():
-            db.session.remove()  # Clear the session
-
-            # Use raw SQL to drop tables
-            with db.engine.connect() as connection:
-                transaction = connection.begin()  # Begin a transaction
-                try:
-                    # Reflect the database and drop each table with CASCADE
-                    inspector = inspect(db.engine)
-                    for table_name in inspector.get_table_names():
-                        print(f"Dropping table: {table_name}")
-                        connection.execute(
-                            text(f"DROP TABLE IF EXISTS {table_name} CASCADE")
-                        )
-
-                    transaction.commit()  # Commit the transaction
-                    print("All tables dropped successfully.")
-                except Exception as e:
-                    transaction.rollback()  # Rollback in case of an error
-                    print(f"Error dropping tables: {e}")
+        TEST_DATABASE.rollback()
 
     def test_get_categories_success(self):
         """Test retrieving all categories."""
@@ -105,6 +146,115 @@ class TriviaTestCase(unittest.TestCase):
         self.assertEqual(response.status_code, 404)
         self.assertFalse(data["success"])
 
+    def test_get_categories_cached(self):
+        """Test repeated category reads are served from the response cache."""
+        first = self.client.get("/categories")
+        second = self.client.get("/categories")
+        response = self.client.get("/cache/stats")
+        data = json.loads(response.data)
+        print(f"The response JSON is: {data}")
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(data["cache"]["misses"], 1)
+        self.assertEqual(data["cache"]["hits"], 1)
+
+    def test_response_cache_redis_success(self):
+        """Test the Redis cache backend: hits, invalidation and TTL."""
+        client = FakeRedis()
+        app = self.make_app(
+            {
+                "RESPONSE_CACHE": "redis",
+                "RESPONSE_CACHE_REDIS_CLIENT": client,
+                "RESPONSE_CACHE_TTL": 60,
+            }
+        )
+        app_client = app.test_client()
+        first = app_client.get("/categories/1/questions")
+        second = app_client.get("/categories/1/questions")
+        self.assertEqual(first.data, second.data)
+        self.assertIn("trivia:categories/1/questions", client.values)
+
+        app_client.post(
+            "/questions",
+            json={"question": "Q?", "answer": "A", "category": "1", "difficulty": 1},
+        )
+        response = app_client.get("/categories/1/questions")
+        total = json.loads(first.data)["total_questions"]
+        self.assertEqual(json.loads(response.data)["total_questions"], total + 1)
+
+        # Past the TTL the entry is gone and the listing is built again
+        started = time.monotonic()
+        client.clock = lambda: started + 61
+        app_client.get("/categories/1/questions")
+
+        response = app_client.get("/cache/stats")
+        data = json.loads(response.data)
+        print(f"The response JSON is: {data}")
+        self.assertEqual(data["cache"]["backend"], "redis")
+        self.assertEqual(data["cache"]["hits"], 1)
+        self.assertEqual(data["cache"]["misses"], 3)
+        self.assertEqual(data["cache"]["errors"], 0)
+
+    def test_response_cache_stale_build_failure(self):
+        """Test a body built before an invalidation is not cached."""
+        for cache in (LRUCache(), RedisCache(FakeRedis())):
+            generation = cache.generation("categories")
+            cache.delete("categories")
+            cache.set("categories", b"stale", generation)
+            self.assertIsNone(cache.get("categories"))
+
+            cache.set("categories", b"fresh", cache.generation("categories"))
+            self.assertEqual(cache.get("categories"), b"fresh")
+
+    def test_fast_json_matches_default_success(self):
+        """Test orjson and stdlib render the same bytes with 10+ categories."""
+        fast = self.make_app({"FAST_JSON": True}).test_client()
+        with self.app.app_context():
+            for number in range(db.session.query(Category).count(), 12):
+                db.session.add(Category(f"Category {number}"))
+            db.session.commit()
+
+        expected = self.client.get("/categories").data
+        response = fast.get("/categories")
+        data = json.loads(response.data)
+        print(f"The response JSON is: {data}")
+        self.assertGreaterEqual(len(data["categories"]), 10)
+        self.assertEqual(response.data, expected)
+
+    def test_fast_json_non_ascii_matches_default_success(self):
+        """Test question lists with and without non-ASCII text match bytes."""
+        fast = self.make_app({"FAST_JSON": True}).test_client()
+        with self.app.app_context():
+            question = Question("At what °C does water boil?", "100°C", 1, 1)
+            db.session.add(question)
+            db.session.commit()
+            question_id = question.id
+
+        for path in ("/questions", f"/questions?after_id={question_id - 1}"):
+            expected = self.client.get(path).data
+            response = fast.get(path)
+            print(f"The response body is: {response.data}")
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data, expected)
+        self.assertIn(b"100\\u00b0C", response.data)
+
+    def test_category_questions_cache_invalidated(self):
+        """Test adding a question invalidates its cached category listing."""
+        response = self.client.get("/categories/1/questions")
+        total = json.loads(response.data)["total_questions"]
+
+        new_question = {
+            "question": "What is the chemical symbol for gold?",
+            "answer": "Au",
+            "category": "1",
+            "difficulty": 2,
+        }
+        self.client.post("/questions", json=new_question)
+
+        response = self.client.get("/categories/1/questions")
+        data = json.loads(response.data)
+        print(f"The response JSON is: {data}")
+        self.assertEqual(data["total_questions"], total + 1)
+
     def test_get_questions_success(self):
         """Test retrieving paginated questions."""
         response = self.client.get("/questions?page=1")
@@ -115,6 +265,43 @@ class TriviaTestCase(unittest.TestCase):
         self.assertTrue(data["questions"])
         self.assertTrue(data["total_questions"])
 
+    def test_get_questions_not_modified(self):
+        """Test a current ETag is answered with 304 and no body."""
+        response = self.client.get("/questions")
+        etag = response.headers["ETag"]
+
+        response = self.client.get("/questions", headers={"If-None-Match": etag})
+        print(f"The status code is: {response.status_code}")
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b"")
+
+    def test_get_questions_etag_changes_after_write(self):
+        """Test adding a question invalidates previously issued ETags."""
+        response = self.client.get("/questions")
+        etag = response.headers["ETag"]
+
+        new_question = {
+            "question": "What is the capital of Italy?",
+            "answer": "Rome",
+            "category": "3",
+            "difficulty": 1,
+        }
+        self.client.post("/questions", json=new_question)
+
+        response = self.client.get("/questions", headers={"If-None-Match": etag})
+        print(f"The status code is: {response.status_code}")
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+
+    def test_get_questions_etag_differs_after_fork(self):
+        """Test a forked worker issues ETags that don't match its parent's."""
+        etag = self.client.get("/questions").headers["ETag"]
+        with mock.patch("models.os.getpid", return_value=os.getpid() + 1):
+            response = self.client.get("/questions", headers={"If-None-Match": etag})
+        print(f"The status code is: {response.status_code}")
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+
     def test_get_questions_failure(self):
         """Test 404 error when no questions are available."""
         with self.app.app_context():
@@ -127,6 +314,25 @@ class TriviaTestCase(unittest.TestCase):
         self.assertEqual(response.status_code, 404)
         self.assertFalse(data["success"])
 
+    def test_get_questions_after_id_success(self):
+        """Test retrieving questions with a keyset cursor."""
+        response = self.client.get("/questions?after_id=0")
+        data = json.loads(response.data)
+        print(f"The response JSON is: {data}")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(data["success"])
+        self.assertTrue(data["questions"])
+        self.assertEqual(data["next_after_id"], data["questions"][-1]["id"])
+        self.assertTrue(all(q["id"] > 0 for q in data["questions"]))
+
+    def test_get_questions_after_id_failure(self):
+        """Test 404 error when the cursor is past the last question."""
+        response = self.client.get("/questions?after_id=99999")
+        data = json.loads(response.data)
+        print(f"The response JSON is: {data}")
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(data["success"])
+
     def test_delete_question_success(self):
         """Test deleting an existing question."""
         with self.app.app_context():
@@ -149,6 +355,139 @@ class TriviaTestCase(unittest.TestCase):
         self.assertEqual(response.status_code, 404)
         self.assertFalse(data["success"])
 
+    def test_bulk_delete_questions_success(self):
+        """Test deleting questions by id and filter in one request."""
+        response = self.client.post(
+            "/questions/bulk-delete", json={"ids": [20, 21, 9999], "category": 1}
+        )
+        data = json.loads(response.data)
+        print(f"The response JSON is: {data}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data["deleted"], [20, 21])
+        self.assertEqual(data["total_deleted"], 2)
+        response = self.client.get("/categories/1/questions")
+        self.assertEqual(json.loads(response.data)["total_questions"], 1)
+
+    def test_bulk_delete_questions_failure(self):
+        """Test 400 error when no ids or filters are given."""
+        response = self.client.post("/questions/bulk-delete", json={})
+        data = json.loads(response.data)
+        print(f"The response JSON is: {data}")
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(data["success"])
+
+    def test_soft_delete_question_success(self):
+        """Test soft-deleted questions are hidden until purged, except in sessions."""
+        app = self.make_app({"SOFT_DELETE": True})
+        client = app.test_client()
+        session = json.loads(
+            client.post("/quizzes/sessions", json={"quiz_category": {"id": 1}}).data
+        )
+        response = client.post("/questions/bulk-delete", json={"category": 1})
+        data = json.loads(response.data)
+        print(f"The response JSON is: {data}")
+        self.assertEqual(data["total_deleted"], session["total_questions"])
+        self.assertEqual(client.get("/categories/1/questions").status_code, 404)
+        self.assertEqual(
+            client.delete(f"/questions/{data['deleted'][0]}").status_code, 404
+        )
+
+        # A quiz started before the delete still gets its questions
+        response = client.post(f"/quizzes/sessions/{session['session_id']}/next")
+        self.assertIn(json.loads(response.data)["question"]["id"], data["deleted"])
+
+        result = app.test_cli_runner().invoke(
+            args=["purge-questions", "--older-than", "0"]
+        )
+        self.assertIn(f"Purged {data['total_deleted']} questions", result.output)
+        with app.app_context():
+            self.assertIsNone(
+                db.session.get(
+                    Question,
+                    data["deleted"][0],
+                    execution_options={"include_deleted": True},
+                )
+            )
+
+    def test_soft_deleted_question_in_session_success(self):
+        """Test a running quiz session still plays questions deleted since."""
+        app = self.make_app({"SOFT_DELETE": True})
+        client = app.test_client()
+        session = json.loads(
+            client.post("/quizzes/sessions", json={"quiz_category": {"id": 1}}).data
+        )
+        first = json.loads(
+            client.post(f"/quizzes/sessions/{session['session_id']}/next").data
+        )
+        with app.app_context():
+            remaining = [
+                question_id
+                for (question_id,) in db.session.query(Question.id).filter(
+                    Question.category == 1, Question.id != first["question"]["id"]
+                )
+            ]
+        for question_id in remaining:
+            self.assertEqual(
+                client.delete(f"/questions/{question_id}").status_code, 200
+            )
+
+        played = []
+        for _ in range(first["remaining"]):
+            response = client.post(f"/quizzes/sessions/{session['session_id']}/next")
+            data = json.loads(response.data)
+            print(f"The response JSON is: {data}")
+            played.append(data["question"]["id"])
+        self.assertEqual(sorted(played), sorted(remaining))
+        self.assertEqual(
+            json.loads(client.get("/categories/1/questions").data)["total_questions"], 1
+        )
+
+    def test_soft_delete_without_migration_failure(self):
+        """Test a database without deleted_at works unless SOFT_DELETE is on."""
+        # Use this test's own database instead of the shared transaction
+        TEST_DATABASE.rollback()
+        handle, database_file = tempfile.mkstemp(suffix=".db")
+        os.close(handle)
+        self.addCleanup(os.remove, database_file)
+        config = {
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{database_file}",
+            "TESTING": True,
+        }
+
+        app = create_app(config)
+        with app.app_context():
+            db.create_all()
+            with db.engine.begin() as connection:
+                connection.exec_driver_sql("DROP INDEX ix_questions_deleted_at")
+                connection.exec_driver_sql(
+                    "DROP INDEX ix_questions_live_category_difficulty"
+                )
+                connection.exec_driver_sql(
+                    "ALTER TABLE questions DROP COLUMN deleted_at"
+                )
+            db.session.add(Category("Science"))
+            db.session.commit()
+        client = app.test_client()
+        new_question = {"question": "Q?", "answer": "A", "category": 1, "difficulty": 1}
+        self.assertEqual(client.post("/questions", json=new_question).status_code, 201)
+        self.assertEqual(client.get("/questions").status_code, 200)
+        self.assertEqual(client.delete("/questions/1").status_code, 200)
+        with app.app_context():
+            db.engine.dispose()
+
+        with self.assertRaises(RuntimeError) as raised:
+            create_app({**config, "SOFT_DELETE": True})
+        print(f"The error is: {raised.exception}")
+        self.assertIn("0003_question_soft_delete.sql", str(raised.exception))
+
+        # A lazy app checks, and logs the error, once its engine exists
+        app = create_app({**config, "SOFT_DELETE": True, "LAZY_STARTUP": True})
+        self.assertNotIn("sqlalchemy", app.extensions)
+        with self.assertLogs(app.logger, "ERROR") as logs:
+            with app.app_context():
+                db.engine.dispose()
+        self.assertIn("0003_question_soft_delete.sql", logs.output[0])
+
     def test_add_question_success(self):
         """Test adding a new question."""
         new_question = {
@@ -175,6 +514,170 @@ class TriviaTestCase(unittest.TestCase):
         self.assertEqual(response.status_code, 400)
         self.assertFalse(data["success"])
 
+    def test_import_questions_success(self):
+        """Test bulk importing questions reports per-row errors."""
+        rows = [
+            {"question": "Q1?", "answer": "A1", "category": 1, "difficulty": 1},
+            {"question": "Q2?", "answer": "A2", "category": 2, "difficulty": 2},
+            {"question": "Q3?", "answer": "", "category": 2, "difficulty": 2},
+        ]
+        body = "\n".join(json.dumps(row) for row in rows)
+        response = self.client.post("/questions/import?batch_size=1", data=body)
+        data = json.loads(response.data)
+        print(f"The response JSON is: {data}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data["inserted"], 2)
+        self.assertEqual(data["failed"], 1)
+        self.assertEqual(data["errors"][0]["line"], 3)
+
+    def test_import_questions_csv_success(self):
+        """Test a CSV upload skips the invalid row and keeps the others."""
+        body = (
+            "question,answer,category,difficulty\n"
+            '"Who wrote ""Dune"", in 1965?",Frank Herbert,5,2\n'
+            "Bad category?,Nobody,999,1\n"
+            "What is 2 + 2?,4,1,1\n"
+        )
+        response = self.client.post(
+            "/questions/import", data=body, content_type="text/csv"
+        )
+        data = json.loads(response.data)
+        print(f"The response JSON is: {data}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data["inserted"], 2)
+        self.assertEqual(data["failed"], 1)
+        self.assertEqual(data["errors"][0]["line"], 3)
+
+        response = self.client.post("/questions/search", json={"searchTerm": "Dune"})
+        questions = json.loads(response.data)["questions"]
+        self.assertEqual(questions[0]["question"], 'Who wrote "Dune", in 1965?')
+
+    def test_import_questions_rejected_row_failure(self):
+        """Test a row the database rejects fails alone, not its whole batch."""
+        rows = [
+            {"question": "Q1?", "answer": "A1", "category": 1, "difficulty": 1},
+            {
+                "question": {"not": "text"},
+                "answer": "A2",
+                "category": 1,
+                "difficulty": 1,
+            },
+            {"question": "Q3?", "answer": "A3", "category": 1, "difficulty": 1},
+        ]
+        body = "\n".join(json.dumps(row) for row in rows)
+        response = self.client.post("/questions/import", data=body)
+        data = json.loads(response.data)
+        print(f"The response JSON is: {data}")
+        self.assertEqual(data["inserted"], 2)
+        self.assertEqual(data["failed"], 1)
+        self.assertEqual(data["errors"][0]["line"], 2)
+
+    def test_import_questions_command_success(self):
+        """Test the import-questions CLI command loads a CSV file."""
+        with tempfile.NamedTemporaryFile(
+            "w", suffix=".csv", delete=False, encoding="utf-8"
+        ) as upload:
+            upload.write("question,answer,category,difficulty\n")
+            upload.write("What is the capital of Peru?,Lima,3,2\n")
+            upload.write("Missing answer?,,3,2\n")
+        self.addCleanup(os.remove, upload.name)
+
+        result = self.app.test_cli_runner().invoke(
+            args=["import-questions", upload.name, "--batch-size", "10"]
+        )
+        print(f"The command output is: {result.output}")
+        self.assertEqual(result.exit_code, 0)
+        report = json.loads(result.output)
+        self.assertEqual(report["inserted"], 1)
+        self.assertEqual(report["failed"], 1)
+
+    def test_import_questions_invalid_utf8_failure(self):
+        """Test an undecodable row is reported and the rest still imported."""
+        before = self.client.get("/categories/1/questions")
+        total = json.loads(before.data)["total_questions"]
+        row = {"question": "Q?", "answer": "A", "category": 1, "difficulty": 1}
+        body = b"\n".join(
+            [
+                json.dumps(row).encode(),
+                json.dumps(row).encode(),
+                b'{"question": "\xff?", "answer": "A", "category": 1, "difficulty": 1}',
+                json.dumps(row).encode(),
+            ]
+        )
+        response = self.client.post("/questions/import?batch_size=1", data=body)
+        data = json.loads(response.data)
+        print(f"The response JSON is: {data}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data["inserted"], 3)
+        self.assertEqual(data["failed"], 1)
+        self.assertEqual(data["errors"][0], {"line": 3, "error": "invalid UTF-8"})
+
+        response = self.client.get("/categories/1/questions")
+        self.assertEqual(json.loads(response.data)["total_questions"], total + 3)
+
+    def test_import_questions_failure(self):
+        """Test 400 error for an unsupported import format."""
+        response = self.client.post("/questions/import?format=xml", data="")
+        data = json.loads(response.data)
+        print(f"The response JSON is: {data}")
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(data["success"])
+
+    def test_export_questions_success(self):
+        """Test streaming an NDJSON export filtered by category."""
+        response = self.client.get("/questions/export?category=1")
+        rows = [json.loads(line) for line in response.data.splitlines()]
+        print(f"The exported rows are: {rows}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "application/x-ndjson")
+        self.assertTrue(rows)
+        self.assertTrue(all(row["category"] == 1 for row in rows))
+
+    def test_export_questions_csv_success(self):
+        """Test a CSV export quotes commas and newlines and streams its rows."""
+        app = self.make_app({"EXPORT_CHUNK_SIZE": 2})
+        with app.app_context():
+            question = Question("Name, in order,\nthree colors", 'Red, "Blue"', 1, 1)
+            db.session.add(question)
+            db.session.commit()
+            question_id = question.id
+
+        with mock.patch.object(
+            Query, "yield_per", autospec=True, side_effect=Query.yield_per
+        ) as yield_per:
+            response = app.test_client().get(
+                "/questions/export?format=csv&category=1", buffered=False
+            )
+            chunks = list(response.response)
+        rows = list(csv.reader(io.StringIO(b"".join(chunks).decode())))
+        print(f"The exported rows are: {rows}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "text/csv")
+        # Chunks of 2 lines, written as the rows are fetched
+        self.assertGreater(len(chunks), 1)
+        yield_per.assert_called_once_with(mock.ANY, 2)
+        self.assertEqual(
+            rows[0], ["id", "question", "answer", "category", "difficulty"]
+        )
+        self.assertIn(
+            [
+                str(question_id),
+                "Name, in order,\nthree colors",
+                'Red, "Blue"',
+                "1",
+                "1",
+            ],
+            rows[1:],
+        )
+
+    def test_export_questions_failure(self):
+        """Test 400 error for an unsupported export format."""
+        response = self.client.get("/questions/export?format=xml")
+        data = json.loads(response.data)
+        print(f"The response JSON is: {data}")
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(data["success"])
+
     def test_search_questions_success(self):
         """Test searching for questions."""
         search_data = {"searchTerm": "autobiography"}
@@ -194,6 +697,15 @@ class TriviaTestCase(unittest.TestCase):
         self.assertEqual(response.status_code, 404)
         self.assertFalse(data["success"])
 
+    def test_search_questions_paginated(self):
+        """Test search results are paginated like /questions."""
+        response = self.client.post("/questions/search?page=2", json={"searchTerm": ""})
+        data = json.loads(response.data)
+        print(f"The response JSON is: {data}")
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(data["total_questions"], 10)
+        self.assertEqual(len(data["questions"]), data["total_questions"] - 10)
+
     def test_get_questions_by_category_success(self):
         """Test retrieving questions by category."""
         response = self.client.get("/categories/1/questions")
@@ -203,6 +715,18 @@ class TriviaTestCase(unittest.TestCase):
         self.assertTrue(data["success"])
         self.assertTrue(data["questions"])
 
+    def test_get_questions_by_category_matches_format(self):
+        """Test the column-tuple serialization matches Question.format()."""
+        response = self.client.get("/categories/1/questions")
+        data = json.loads(response.data)
+        with self.app.app_context():
+            expected = [
+                q.format()
+                for q in Question.query.filter_by(category=1).order_by(Question.id)
+            ]
+        print(f"The response JSON is: {data}")
+        self.assertEqual(data["questions"], expected)
+
     def test_get_questions_by_category_failure(self):
         """Test 404 error when category has no questions."""
         response = self.client.get("/categories/999/questions")
@@ -224,6 +748,33 @@ class TriviaTestCase(unittest.TestCase):
         self.assertTrue(data["success"])
         self.assertIsNotNone(data["question"])
 
+    def test_play_quiz_excludes_previous_questions(self):
+        """Test the quiz never repeats a question and ends when exhausted."""
+        with self.app.app_context():
+            category_ids = [q.id for q in Question.query.filter_by(category=1).all()]
+
+        previous_questions = []
+        for _ in category_ids:
+            quiz_data = {
+                "previous_questions": previous_questions,
+                "quiz_category": {"id": "1"},
+            }
+            response = self.client.post("/quizzes", json=quiz_data)
+            data = json.loads(response.data)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn(data["question"]["id"], previous_questions)
+            previous_questions.append(data["question"]["id"])
+
+        quiz_data = {
+            "previous_questions": previous_questions,
+            "quiz_category": {"id": "1"},
+        }
+        response = self.client.post("/quizzes", json=quiz_data)
+        data = json.loads(response.data)
+        print(f"The response JSON is: {data}")
+        self.assertEqual(sorted(previous_questions), sorted(category_ids))
+        self.assertIsNone(data["question"])
+
     def test_play_quiz_failure(self):
         """Test playing quiz with no available questions."""
         quiz_data = {
@@ -237,6 +788,821 @@ class TriviaTestCase(unittest.TestCase):
         self.assertTrue(data["success"])
         self.assertIsNone(data["question"])
 
+    def test_play_quiz_weighted_success(self):
+        """Test difficulty targets and category weights steer the quiz."""
+        quiz_data = {
+            "previous_questions": [],
+            "quiz_category": {"id": 0},
+            "difficulty": {"start": 1, "end": 4},
+            "category_weights": {"1": 1, "2": 0, "3": 0, "4": 0, "5": 0, "6": 0},
+        }
+        for _ in range(10):
+            response = self.client.post("/quizzes", json=quiz_data)
+            data = json.loads(response.data)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(data["question"]["category"], 1)
+        print(f"The response JSON is: {data}")
+
+    def test_play_quiz_weighted_failure(self):
+        """Test 400 error for malformed quiz weighting options."""
+        quiz_data = {
+            "previous_questions": [],
+            "quiz_category": {"id": 0},
+            "difficulty": {"start": 1},
+        }
+        response = self.client.post("/quizzes", json=quiz_data)
+        data = json.loads(response.data)
+        print(f"The response JSON is: {data}")
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(data["success"])
+
+    def test_play_quiz_non_finite_options_failure(self):
+        """Test 400 error for infinite, NaN or overflowing quiz options."""
+        for options in (
+            '"category_weights": {"1": "inf"}',
+            '"category_weights": {"1": 1e308, "2": 1e308}',
+            '"category_weights": {"1": NaN}',
+            '"difficulty": NaN',
+            '"difficulty": {"start": 1, "end": Infinity}',
+        ):
+            body = (
+                f'{{"previous_questions": [], "quiz_category": {{"id": 0}}, {options}}}'
+            )
+            for path in ("/quizzes", "/quizzes/batch"):
+                response = self.client.post(
+                    path, data=body, content_type="application/json"
+                )
+                data = json.loads(response.data)
+                print(f"The response JSON for {options} is: {data}")
+                self.assertEqual(response.status_code, 400)
+
+    def test_play_quiz_far_difficulty_success(self):
+        """Test a far-off difficulty target still returns a question."""
+        quiz_data = {
+            "previous_questions": [],
+            "quiz_category": {"id": 0},
+            "difficulty": 1e308,
+        }
+        response = self.client.post("/quizzes", json=quiz_data)
+        data = json.loads(response.data)
+        print(f"The response JSON is: {data}")
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNotNone(data["question"])
+
+    def test_play_quiz_batch_success(self):
+        """Test a batch of distinct quiz questions in one request."""
+        quiz_data = {
+            "previous_questions": [],
+            "quiz_category": {"id": 0},
+            "count": 5,
+        }
+        response = self.client.post("/quizzes/batch", json=quiz_data)
+        data = json.loads(response.data)
+        print(f"The response JSON is: {data}")
+        ids = [question["id"] for question in data["questions"]]
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(ids), 5)
+        self.assertEqual(len(set(ids)), 5)
+
+    def test_play_quiz_batch_failure(self):
+        """Test 400 error for a batch size out of range."""
+        quiz_data = {"previous_questions": [], "quiz_category": {"id": 0}, "count": 0}
+        response = self.client.post("/quizzes/batch", json=quiz_data)
+        data = json.loads(response.data)
+        print(f"The response JSON is: {data}")
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(data["success"])
+
+    def test_quiz_session_success(self):
+        """Test playing a quiz through a server-side session."""
+        response = self.client.post(
+            "/quizzes/sessions", json={"quiz_category": {"id": "1"}}
+        )
+        data = json.loads(response.data)
+        print(f"The response JSON is: {data}")
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(data["session_id"])
+
+        seen = []
+        for _ in range(data["total_questions"]):
+            response = self.client.post(f"/quizzes/sessions/{data['session_id']}/next")
+            question = json.loads(response.data)["question"]
+            self.assertNotIn(question["id"], seen)
+            seen.append(question["id"])
+
+        response = self.client.post(f"/quizzes/sessions/{data['session_id']}/next")
+        self.assertIsNone(json.loads(response.data)["question"])
+
+    def test_quiz_session_redis_success(self):
+        """Test a Redis quiz session continues on another worker's app."""
+        client = FakeRedis()
+        config = {"QUIZ_SESSIONS": "redis", "QUIZ_SESSION_REDIS_CLIENT": client}
+        first = self.make_app(config).test_client()
+        second = self.make_app(config).test_client()
+
+        response = first.post("/quizzes/sessions", json={"quiz_category": None})
+        data = json.loads(response.data)
+        print(f"The response JSON is: {data}")
+        self.assertEqual(data["total_questions"], 5)
+
+        seen = set()
+        for worker in (first, second, first, second, first):
+            response = worker.post(f"/quizzes/sessions/{data['session_id']}/next")
+            question = json.loads(response.data)["question"]
+            self.assertNotIn(question["id"], seen)
+            seen.add(question["id"])
+
+        response = second.post(f"/quizzes/sessions/{data['session_id']}/next")
+        self.assertIsNone(json.loads(response.data)["question"])
+
+    def test_quiz_session_failure(self):
+        """Test 404 error for an unknown quiz session."""
+        response = self.client.post("/quizzes/sessions/unknown/next")
+        data = json.loads(response.data)
+        print(f"The response JSON is: {data}")
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(data["success"])
+
+    def test_metrics_success(self):
+        """Test instrumentation adds Server-Timing and Prometheus metrics."""
+        app = self.make_app(
+            {
+                "INSTRUMENTATION": True,
+            }
+        )
+        client = app.test_client()
+        response = client.get("/questions")
+        print(f"The Server-Timing header is: {response.headers['Server-Timing']}")
+        self.assertIn("db;dur=", response.headers["Server-Timing"])
+
+        response = client.get("/metrics")
+        body = response.data.decode()
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(
+            'trivia_requests_total{endpoint="/questions",method="GET",status="200"} 1',
+            body,
+        )
+        self.assertIn('trivia_db_statements_total{endpoint="/questions"} 2', body)
+
+    def test_metrics_failure(self):
+        """Test 404 error for /metrics when instrumentation is off."""
+        response = self.client.get("/metrics")
+        data = json.loads(response.data)
+        print(f"The response JSON is: {data}")
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(data["success"])
+
+    def test_profiling_success(self):
+        """Test a request sending the profile header writes a pstats file."""
+        output_dir = tempfile.mkdtemp()
+        app = self.make_app(
+            {
+                "PROFILING": True,
+                "PROFILE_DIR": output_dir,
+                "PROFILE_TOKEN": "secret",
+            }
+        )
+        response = app.test_client().get("/questions", headers={"X-Profile": "secret"})
+        output = response.headers["X-Profile-Output"]
+        print(f"The profile output is: {output}")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(output.endswith(".pstats"))
+        self.assertTrue(os.path.exists(os.path.join(output_dir, output)))
+        shutil.rmtree(output_dir)
+
+    def test_profiling_requires_token_failure(self):
+        """Test PROFILING cannot be enabled without a PROFILE_TOKEN."""
+        with self.assertRaises(RuntimeError) as raised:
+            create_app(
+                {"SQLALCHEMY_DATABASE_URI": self.database_path, "PROFILING": True}
+            )
+        print(f"The error is: {raised.exception}")
+
+    def test_profiling_concurrent_failure(self):
+        """Test a request is served unprofiled while another is profiled."""
+        output_dir = tempfile.mkdtemp()
+        app = self.make_app(
+            {"PROFILING": True, "PROFILE_DIR": output_dir, "PROFILE_TOKEN": "secret"}
+        )
+        # Held by the request being profiled
+        with app.wsgi_app._lock:
+            response = app.test_client().get(
+                "/questions", headers={"X-Profile": "secret"}
+            )
+        print(f"The status code is: {response.status_code}")
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("X-Profile-Output", response.headers)
+        self.assertEqual(os.listdir(output_dir), [])
+        shutil.rmtree(output_dir)
+
+    def test_profiling_failure(self):
+        """Test a wrong profile token neither profiles nor opens a window."""
+        output_dir = tempfile.mkdtemp()
+        app = self.make_app(
+            {
+                "PROFILING": True,
+                "PROFILE_DIR": output_dir,
+                "PROFILE_TOKEN": "secret",
+            }
+        )
+        client = app.test_client()
+        response = client.get("/questions", headers={"X-Profile": "wrong"})
+        self.assertNotIn("X-Profile-Output", response.headers)
+        response = client.post("/profiling/window", json={"seconds": 10})
+        data = json.loads(response.data)
+        print(f"The response JSON is: {data}")
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(os.listdir(output_dir), [])
+        shutil.rmtree(output_dir)
+
+    def test_retry_transient_success(self):
+        """Test a transient DB error is retried instead of returned."""
+        app = self.make_app({"DB_RETRY_BACKOFF": 0})
+        next_question = QuestionPool.next_question
+        failures = []
+
+        def fail_once(pool, *args, **kwargs):
+            if not failures:
+                failures.append(
+                    OperationalError("SELECT", {}, Exception("connection reset"))
+                )
+                failures[0].connection_invalidated = True
+                raise failures[0]
+            return next_question(pool, *args, **kwargs)
+
+        with mock.patch.object(QuestionPool, "next_question", fail_once):
+            response = app.test_client().post("/quizzes", json={})
+        data = json.loads(response.data)
+        print(f"The response JSON is: {data}")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(data["success"])
+
+    def test_load_shedding_failure(self):
+        """Test 503 with Retry-After once the concurrency limit is reached."""
+        app = self.make_app(
+            {
+                "MAX_CONCURRENT_REQUESTS": 1,
+            }
+        )
+        started, release = threading.Event(), threading.Event()
+
+        @app.route("/slow")
+        def slow():
+            started.set()
+            release.wait(5)
+            return "ok"
+
+        worker = threading.Thread(target=app.test_client().get, args=("/slow",))
+        worker.start()
+        started.wait(5)
+        response = app.test_client().get("/categories")
+        release.set()
+        worker.join()
+        data = json.loads(response.data)
+        print(f"The response JSON is: {data}")
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers["Retry-After"], "1")
+        self.assertFalse(data["success"])
+
+    def test_compression_success(self):
+        """Test large responses are gzipped when the client accepts it."""
+        app = self.make_app({"COMPRESSION_MIN_SIZE": 100})
+        response = app.test_client().get(
+            "/categories/1/questions", headers={"Accept-Encoding": "gzip"}
+        )
+        data = json.loads(gzip.decompress(response.data))
+        print(f"The response JSON is: {data}")
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response.headers["Vary"])
+        self.assertTrue(data["success"])
+
+    @unittest.skipIf(brotli is None, "brotli is not installed")
+    def test_compression_brotli_success(self):
+        """Test Brotli is chosen over gzip when the client accepts both."""
+        app = self.make_app({"COMPRESSION_MIN_SIZE": 100})
+        response = app.test_client().get(
+            "/categories/1/questions", headers={"Accept-Encoding": "gzip, br"}
+        )
+        data = json.loads(brotli.decompress(response.data))
+        print(f"The response JSON is: {data}")
+        self.assertEqual(response.headers["Content-Encoding"], "br")
+        self.assertTrue(data["success"])
+
+    def test_compression_cached_success(self):
+        """Test a repeated payload is compressed once and then reused."""
+        app = self.make_app({"COMPRESSION_MIN_SIZE": 100})
+        client = app.test_client()
+        with mock.patch(
+            "flaskr.compression.compress", wraps=flaskr.compression.compress
+        ) as compress:
+            first = client.get(
+                "/categories/1/questions", headers={"Accept-Encoding": "gzip"}
+            )
+            second = client.get(
+                "/categories/1/questions", headers={"Accept-Encoding": "gzip"}
+            )
+        response = client.get("/cache/stats")
+        data = json.loads(response.data)
+        print(f"The response JSON is: {data}")
+        self.assertEqual(compress.call_count, 1)
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(second.headers["Content-Encoding"], "gzip")
+        self.assertEqual(data["compression"]["hits"], 1)
+        self.assertEqual(data["compression"]["misses"], 1)
+
+    def test_compression_not_modified_success(self):
+        """Test a compressed response is revalidated with a bodiless 304."""
+        app = self.make_app({"COMPRESSION_MIN_SIZE": 100})
+        client = app.test_client()
+        headers = {"Accept-Encoding": "gzip"}
+        response = client.get("/questions", headers=headers)
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+
+        response = client.get(
+            "/questions", headers={**headers, "If-None-Match": response.headers["ETag"]}
+        )
+        print(f"The status code is: {response.status_code}")
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b"")
+        self.assertNotIn("Content-Encoding", response.headers)
+
+    def test_compression_failure(self):
+        """Test responses stay uncompressed without Accept-Encoding."""
+        response = self.client.get("/categories/1/questions")
+        data = json.loads(response.data)
+        print(f"The response JSON is: {data}")
+        self.assertNotIn("Content-Encoding", response.headers)
+        self.assertTrue(data["success"])
+
+    def test_read_model_success(self):
+        """Test the read model serves the same data and sees new questions."""
+        app = self.make_app({"READ_MODEL": True})
+        client = app.test_client()
+        for path in ("/categories", "/questions?page=2", "/categories/1/questions"):
+            self.assertEqual(client.get(path).data, self.client.get(path).data)
+
+        client.post(
+            "/questions",
+            json={
+                "question": "Which planet is the Red Planet?",
+                "answer": "Mars",
+                "category": 1,
+                "difficulty": 1,
+            },
+        )
+        response = client.post("/questions/search", json={"searchTerm": "red planet"})
+        data = json.loads(response.data)
+        print(f"The response JSON is: {data}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data["questions"][0]["answer"], "Mars")
+        stats = json.loads(client.get("/cache/stats").data)["read_model"]
+        self.assertGreater(stats["memory_bytes"]["total"], 0)
+
+    def test_read_model_rebuild_success(self):
+        """Test readers keep the old snapshot while a new one is built."""
+        read_model = ReadModel()
+        old = Snapshot([(1, "Science")], [(1, "Q?", "A", 1, 1)])
+        new = Snapshot([(1, "Science")], [(1, "Q?", "A", 1, 1), (2, "Q2?", "B", 1, 2)])
+        started, release = threading.Event(), threading.Event()
+
+        def build():
+            started.set()
+            release.wait(5)
+            return new
+
+        with mock.patch.object(Snapshot, "from_database", return_value=old):
+            read_model.current()
+        read_model.invalidate()
+        with mock.patch.object(Snapshot, "from_database", side_effect=build):
+            builder = threading.Thread(target=read_model.current)
+            builder.start()
+            started.wait(5)
+            self.assertIs(read_model.current(), old)
+            release.set()
+            builder.join()
+        stats = read_model.stats()
+        print(f"The read model stats are: {stats}")
+        self.assertIs(read_model.current(), new)
+        self.assertEqual(stats["builds"], 2)
+        self.assertEqual(stats["memory_bytes"], new.memory)
+
+    def test_read_model_failure(self):
+        """Test the read model returns 404 for a category without questions."""
+        app = self.make_app({"READ_MODEL": True})
+        response = app.test_client().get("/categories/1000/questions")
+        data = json.loads(response.data)
+        print(f"The response JSON is: {data}")
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(data["success"])
+
+    def test_rate_limit_success(self):
+        """Test requests within the burst are served."""
+        app = self.make_app({"RATE_LIMIT": (1, 2)})
+        client = app.test_client()
+        responses = [client.get("/categories") for _ in range(2)]
+        data = json.loads(responses[-1].data)
+        print(f"The response JSON is: {data}")
+        self.assertEqual([r.status_code for r in responses], [200, 200])
+        self.assertTrue(data["success"])
+
+    def test_rate_limit_failure(self):
+        """Test a client over its limit gets 429 with Retry-After."""
+        app = self.make_app(
+            {"RATE_LIMIT": None, "RATE_LIMITS": {"get_categories": (0.5, 1)}}
+        )
+        client = app.test_client()
+        client.get("/categories")
+        response = client.get("/categories")
+        data = json.loads(response.data)
+        print(f"The response JSON is: {data}")
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.headers["Retry-After"], "2")
+        self.assertFalse(data["success"])
+        # Other endpoints are not limited
+        self.assertEqual(client.get("/questions").status_code, 200)
+
+    def test_single_flight_success(self):
+        """Test concurrent calls for one key share a single call."""
+        flights = SingleFlight()
+        started, release = threading.Event(), threading.Event()
+        calls, results = [], []
+
+        def build():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return b"body"
+
+        leader = threading.Thread(
+            target=lambda: results.append(flights.do("key", build))
+        )
+        leader.start()
+        started.wait(5)
+        followers = [
+            threading.Thread(target=lambda: results.append(flights.do("key", build)))
+            for _ in range(3)
+        ]
+        for follower in followers:
+            follower.start()
+        while flights.coalesced < 3:
+            time.sleep(0.01)
+        release.set()
+        for thread in [leader, *followers]:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [b"body"] * 4)
+
+    def test_lazy_startup_success(self):
+        """Test a lazy app warms up before it reports ready."""
+        app = create_wsgi_app(
+            {
+                "SQLALCHEMY_DATABASE_URI": self.database_path,
+                "LAZY_STARTUP": True,
+                "WARM_UP": True,
+                "WARM_UP_CONNECTIONS": 2,
+            }
+        )
+        response = app.test_client().get("/ready")
+        data = json.loads(response.data)
+        print(f"The response JSON is: {data}")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("warm_up", data["startup"]["init_ms"])
+        self.assertNotIn("warm_up_error", data["startup"])
+        # The driver is imported by the warm-up instead
+        self.assertEqual(
+            set(data["startup"]["imports_ms"]), {"models", "flaskr", "total"}
+        )
+        with app.app_context():
+            db.engine.dispose()
+
+    def test_startup_import_report_success(self):
+        """Test the entry point reports import times per module group."""
+        app = create_wsgi_app({"SQLALCHEMY_DATABASE_URI": self.database_path})
+        response = app.test_client().get("/ready")
+        data = json.loads(response.data)
+        print(f"The response JSON is: {data}")
+        imports = data["startup"]["imports_ms"]
+        self.assertEqual(set(imports), {"models", "flaskr", "driver", "total"})
+        self.assertAlmostEqual(
+            imports["total"],
+            imports["models"] + imports["flaskr"] + imports["driver"],
+            delta=0.05,
+        )
+        with app.app_context():
+            db.engine.dispose()
+
+    def test_lazy_startup_record_queries_success(self):
+        """Test a lazy app creates its engine on first use, with listeners."""
+        TEST_DATABASE.rollback()
+        app = create_app(
+            {
+                "SQLALCHEMY_DATABASE_URI": self.database_path,
+                "SQLALCHEMY_RECORD_QUERIES": True,
+                "LAZY_STARTUP": True,
+                "INSTRUMENTATION": True,
+            }
+        )
+        # Flask-SQLAlchemy is only set up by the first app context
+        self.assertNotIn("sqlalchemy", app.extensions)
+        response = app.test_client().get("/categories")
+        data = json.loads(response.data)
+        print(f"The response JSON is: {data}")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("db;dur=", response.headers["Server-Timing"])
+        with app.app_context():
+            db.session.execute(text("SELECT 1"))
+            self.assertTrue(get_recorded_queries())
+            db.engine.dispose()
+
+    def test_lazy_startup_failure(self):
+        """Test 503 from /ready while a background warm-up is running."""
+        release = threading.Event()
+        with mock.patch("flaskr.prewarm_pool", lambda *args: release.wait(5)):
+            app = create_app(
+                {
+                    "SQLALCHEMY_DATABASE_URI": self.database_path,
+                    "LAZY_STARTUP": True,
+                    "WARM_UP": "background",
+                }
+            )
+            response = app.test_client().get("/ready")
+            release.set()
+            app.extensions["startup"].ready.wait(5)
+        data = json.loads(response.data)
+        print(f"The response JSON is: {data}")
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers["Retry-After"], "1")
+        self.assertFalse(data["success"])
+        self.assertEqual(app.test_client().get("/ready").status_code, 200)
+
+    def test_get_pool_status_success(self):
+        """Test the pool endpoint reports checkout statistics."""
+        self.client.get("/questions")
+        response = self.client.get("/db/pool")
+        data = json.loads(response.data)
+        print(f"The response JSON is: {data}")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(data["success"])
+        self.assertGreater(data["pool"]["checkouts"], 0)
+
+
+@unittest.skipIf(TestClient is None, "async serving dependencies are not installed")
+class AsyncTriviaTestCase(unittest.TestCase):
+    """This class runs the ASGI app against a temporary SQLite database"""
+
+    def setUp(self):
+        handle, self.database_file = tempfile.mkstemp(suffix=".db")
+        os.close(handle)
+        database_path = f"sqlite:///{self.database_file}"
+        self.database_path = database_path
+
+        # Create and seed the schema through the Flask app and models
+        app = create_app({"SQLALCHEMY_DATABASE_URI": database_path, "TESTING": True})
+        with app.app_context():
+            db.create_all()
+            science = Category("Science")
+            db.session.add(science)
+            db.session.commit()
+            Question("Who discovered penicillin?", "Alexander Fleming", 1, 3).insert()
+            Question("What is the heaviest organ?", "The Liver", 1, 4).insert()
+            db.engine.dispose()
+
+        self.client = TestClient(
+            create_asgi_app({"SQLALCHEMY_DATABASE_URI": database_path})
+        )
+        self.client.__enter__()
+
+    def tearDown(self):
+        self.client.__exit__(None, None, None)
+        os.remove(self.database_file)
+
+    def test_get_categories_success(self):
+        """Test retrieving all categories over ASGI."""
+        response = self.client.get("/categories")
+        data = response.json()
+        print(f"The response JSON is: {data}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data["categories"], {"1": "Science"})
+
+    def test_get_questions_by_category_failure(self):
+        """Test 404 error over ASGI when category has no questions."""
+        response = self.client.get("/categories/999/questions")
+        data = response.json()
+        print(f"The response JSON is: {data}")
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(data["success"])
+
+    def test_search_questions_success(self):
+        """Test searching for questions over ASGI."""
+        response = self.client.post("/questions/search", json={"searchTerm": "organ"})
+        data = response.json()
+        print(f"The response JSON is: {data}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data["total_questions"], 1)
+
+    def test_search_questions_ranking_success(self):
+        """Test ASGI search ranks whole-word matches first, like Flask."""
+        response = self.client.post("/questions/search", json={"searchTerm": "is"})
+        data = response.json()
+        print(f"The response JSON is: {data}")
+        self.assertEqual(response.status_code, 200)
+        # "is" is a word of question 2 but only part of "discovered" in 1
+        self.assertEqual([question["id"] for question in data["questions"]], [2, 1])
+
+        app = create_app({"SQLALCHEMY_DATABASE_URI": self.database_path})
+        flask_response = app.test_client().post(
+            "/questions/search", json={"searchTerm": "is"}
+        )
+        self.assertEqual(response.content, flask_response.data)
+        with app.app_context():
+            db.engine.dispose()
+
+    def test_soft_deleted_questions_hidden_success(self):
+        """Test ASGI reads skip soft-deleted questions, like Flask."""
+        config = {"SQLALCHEMY_DATABASE_URI": self.database_path, "SOFT_DELETE": True}
+        app = create_app(config)
+        response = app.test_client().post("/questions/bulk-delete", json={"ids": [2]})
+        self.assertEqual(response.status_code, 200)
+        with app.app_context():
+            db.engine.dispose()
+
+        with TestClient(create_asgi_app(config)) as client:
+            response = client.get("/questions")
+            data = response.json()
+            print(f"The response JSON is: {data}")
+            self.assertEqual(data["total_questions"], 1)
+            self.assertEqual([question["id"] for question in data["questions"]], [1])
+
+            response = client.get("/categories/1/questions")
+            self.assertEqual(response.json()["total_questions"], 1)
+            response = client.post("/questions/search", json={"searchTerm": "organ"})
+            self.assertEqual(response.status_code, 404)
+            quiz_data = {"previous_questions": [1], "quiz_category": {"id": "1"}}
+            response = client.post("/quizzes", json=quiz_data)
+            self.assertIsNone(response.json()["question"])
+
+    def test_async_pgbouncer_options_success(self):
+        """Test asyncpg's statement caches are off behind PgBouncer."""
+        options = async_engine_options(
+            {"DB_PGBOUNCER": True}, "postgresql://trivia@localhost/trivia"
+        )
+        print(f"The engine options are: {options}")
+        self.assertIs(options["poolclass"], NullPool)
+        self.assertEqual(
+            options["connect_args"],
+            {"statement_cache_size": 0, "prepared_statement_cache_size": 0},
+        )
+
+    def test_play_quiz_success(self):
+        """Test the async quiz excludes previous questions."""
+        quiz_data = {"previous_questions": [1], "quiz_category": {"id": "1"}}
+        response = self.client.post("/quizzes", json=quiz_data)
+        data = response.json()
+        print(f"The response JSON is: {data}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data["question"]["id"], 2)
+
+
+class ReplicaTriviaTestCase(unittest.TestCase):
+    """This class routes reads to a replica, using two SQLite files"""
+
+    def setUp(self):
+        self.database_files = []
+        for suffix in ("", " (replica)"):
+            handle, database_file = tempfile.mkstemp(suffix=".db")
+            os.close(handle)
+            self.database_files.append(database_file)
+            app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{database_file}"})
+            with app.app_context():
+                db.create_all()
+                db.session.add(Category(f"Science{suffix}"))
+                db.session.commit()
+                Question(
+                    f"Who discovered penicillin?{suffix}", "Alexander Fleming", 1, 3
+                ).insert()
+                db.engine.dispose()
+
+        primary, replica = self.database_files
+        self.app = create_app(
+            {
+                "SQLALCHEMY_DATABASE_URI": f"sqlite:///{primary}",
+                "REPLICA_DATABASE_URIS": [f"sqlite:///{replica}"],
+                "TESTING": True,
+            }
+        )
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.engine.dispose()
+        self.app.extensions["replicas"].stop()
+        for engine in self.app.extensions["replicas"].engines:
+            engine.dispose()
+        for database_file in self.database_files:
+            os.remove(database_file)
+
+    def test_read_from_replica_success(self):
+        """Test read endpoints are answered from the replica."""
+        response = self.client.get("/questions")
+        data = json.loads(response.data)
+        print(f"The response JSON is: {data}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            data["questions"][0]["question"], "Who discovered penicillin? (replica)"
+        )
+
+        # Cached bodies are shared by every client, so built from the primary
+        response = self.client.get("/categories")
+        self.assertEqual(json.loads(response.data)["categories"], {"1": "Science"})
+
+    def test_read_your_writes_success(self):
+        """Test the writing client reads from the primary afterwards."""
+        new_question = {"question": "Q?", "answer": "A", "category": 1, "difficulty": 1}
+        response = self.client.post("/questions", json=new_question)
+        self.assertEqual(response.status_code, 201)
+
+        response = self.client.get("/questions")
+        data = json.loads(response.data)
+        print(f"The response JSON is: {data}")
+        self.assertEqual(data["total_questions"], 2)
+
+        # Other clients of the same process keep reading from the replica
+        response = self.app.test_client().get("/questions")
+        self.assertEqual(json.loads(response.data)["total_questions"], 1)
+
+    def test_read_your_writes_indexes_success(self):
+        """Test indexes rebuilt by another client's read include the write."""
+        for painting, config in (
+            ("Guernica", {}),
+            ("Sunflowers", {"READ_MODEL": True}),
+        ):
+            app = create_app(
+                {
+                    "SQLALCHEMY_DATABASE_URI": self.app.config[
+                        "SQLALCHEMY_DATABASE_URI"
+                    ],
+                    "REPLICA_DATABASE_URIS": self.app.config["REPLICA_DATABASE_URIS"],
+                    "TESTING": True,
+                    **config,
+                }
+            )
+            self.addCleanup(app.extensions["replicas"].stop)
+            writer = app.test_client()
+            new_question = {
+                "question": f"Who painted {painting}?",
+                "answer": "Someone",
+                "category": 1,
+                "difficulty": 2,
+            }
+            writer.post("/questions", json=new_question)
+
+            # Another client's read rebuilds the indexes after the write
+            search = {"searchTerm": painting}
+            app.test_client().post("/questions/search", json=search)
+            app.test_client().get("/categories/1/questions")
+
+            response = writer.post("/questions/search", json=search)
+            data = json.loads(response.data)
+            print(f"The response JSON is: {data}")
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(data["total_questions"], 1)
+
+            response = writer.get("/categories/1/questions")
+            questions = json.loads(response.data)["questions"]
+            self.assertIn(
+                new_question["question"],
+                [question["question"] for question in questions],
+            )
+
+    def test_replica_health_check_success(self):
+        """Test a replica marked down is checked again in the background."""
+        router = self.app.extensions["replicas"]
+        router.health_interval = 0.01
+        router.healthy[router.engines[0]] = False
+        with mock.patch.object(
+            router, "check_health", wraps=router.check_health
+        ) as check_health:
+            # Served by the primary without waiting for a check
+            response = self.client.get("/questions")
+            deadline = time.monotonic() + 5
+            while not router.healthy[router.engines[0]]:
+                self.assertLess(time.monotonic(), deadline)
+                time.sleep(0.01)
+        data = json.loads(response.data)
+        print(f"The response JSON is: {data}")
+        self.assertEqual(data["questions"][0]["question"], "Who discovered penicillin?")
+        self.assertTrue(check_health.called)
+
+    def test_replica_down_failure(self):
+        """Test reads fall back to the primary when no replica is healthy."""
+        router = self.app.extensions["replicas"]
+        router.healthy[router.engines[0]] = False
+        response = self.client.get("/questions")
+        data = json.loads(response.data)
+        print(f"The response JSON is: {data}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data["questions"][0]["question"], "Who discovered penicillin?")
+
 
 # Make the tests conveniently executable
 if __name__ == "__main__":
@@ -0,0 +1,45 @@
+"""
+WSGI entry point for production servers, e.g.:
+
+    gunicorn "wsgi:create_wsgi_app()" --workers 4
+
+It times the imports of the app and passes them to create_app as
+STARTUP_IMPORT_TIMES, reported under `imports_ms` by GET /ready and
+STARTUP_REPORT:
+
+    models   SQLAlchemy, Flask-SQLAlchemy and the models
+    flaskr   the rest of the app package (Flask, the core subsystems)
+    driver   the DBAPI driver of the database URI; left out with
+             LAZY_STARTUP, which imports it on the first request
+    total    all of the above
+"""
+
+import importlib
+import time
+
+
+def _timed(imports, name, load):
+    started = time.perf_counter()
+    result = load()
+    imports[name] = time.perf_counter() - started
+    return result
+
+
+def create_wsgi_app(config=None):
+    config = dict(config or {})
+    imports = {}
+    models = _timed(imports, "models", lambda: importlib.import_module("models"))
+    flaskr = _timed(imports, "flaskr", lambda: importlib.import_module("flaskr"))
+
+    if not config.get("LAZY_STARTUP"):
+        from sqlalchemy.engine import make_url
+
+        database_path = (
+            config.get("SQLALCHEMY_DATABASE_URI") or models.default_database_path()
+        )
+        dialect = make_url(database_path).get_dialect()
+        _timed(imports, "driver", dialect.import_dbapi)
+
+    imports["total"] = sum(imports.values())
+    config["STARTUP_IMPORT_TIMES"] = imports
+    return flaskr.create_app(config)
@@ -14,6 +14,7 @@ class QuizView extends Component {
       categories: {},
       numCorrect: 0,
       currentQuestion: {},
+      upcomingQuestions: [],
       guess: '',
       forceEnd: false,
     };
@@ -35,7 +36,38 @@ class QuizView extends Component {
   }
 
   selectCategory = ({ type, id = 0 }) => {
-    this.setState({ quizCategory: { type, id } }, this.getNextQuestion);
+    this.setState({ quizCategory: { type, id } }, this.prefetchQuestions);
+  };
+
+  // Loads the whole round in one request; getNextQuestion falls back to
+  // /quizzes when the batch runs out or fails
+  prefetchQuestions = () => {
+    $.ajax({
+      url: '/quizzes/batch',
+      type: 'POST',
+      dataType: 'json',
+      contentType: 'application/json',
+      data: JSON.stringify({
+        previous_questions: this.state.previousQuestions,
+        quiz_category: this.state.quizCategory,
+        count: questionsPerPlay,
+      }),
+      xhrFields: {
+        withCredentials: true,
+      },
+      crossDomain: true,
+      success: (result) => {
+        this.setState(
+          { upcomingQuestions: result.questions },
+          this.getNextQuestion
+        );
+        return;
+      },
+      error: (error) => {
+        this.getNextQuestion();
+        return;
+      },
+    });
   };
 
   handleChange = (event) => {
@@ -48,6 +80,20 @@ class QuizView extends Component {
       previousQuestions.push(this.state.currentQuestion.id);
     }
 
+    if (this.state.upcomingQuestions.length) {
+      const [nextQuestion, ...upcomingQuestions] =
+        this.state.upcomingQuestions;
+      this.setState({
+        showAnswer: false,
+        previousQuestions: previousQuestions,
+        currentQuestion: nextQuestion,
+        upcomingQuestions: upcomingQuestions,
+        guess: '',
+        forceEnd: false,
+      });
+      return;
+    }
+
     $.ajax({
       url: '/quizzes', //TODO: update request URL
       type: 'POST',
@@ -94,6 +140,7 @@ class QuizView extends Component {
       showAnswer: false,
       numCorrect: 0,
       currentQuestion: {},
+      upcomingQuestions: [],
       guess: '',
       forceEnd: false,
     });